@@ -0,0 +1,228 @@
+# coding=utf8
+"""
+Benchmarks for union-find and percolation hot paths.
+
+Every case runs in a freshly spawned (not forked) child process with fixed
+seed, so peak RSS of one case is inflated neither by the previous ones nor by
+memory of the parent. Results are printed as a table to
+stderr and as JSON to stdout (or to --output file); JSON of an earlier run can
+be passed with --baseline to report regressions.
+
+    python3 benchmark.py --output bench.json
+    python3 benchmark.py --baseline bench.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from percolation import UF_BACKENDS, Percolation
+from percolation_stats import PercolationStats
+
+SIZES = {
+    "uf": [1000, 2000, 4000, 8000],
+    "percolation": [32, 64, 128, 256],
+    "stats": [16, 32, 64],
+}
+QUICK_SIZES = {
+    "uf": [500, 1000, 2000],
+    "percolation": [16, 32, 64],
+    "stats": [8, 16, 32],
+}
+# quadratic backends are skipped above these sizes
+MAX_SIZES = {
+    ("percolation", "quick_find"): 64,
+    ("stats", "quick_find"): 32,
+}
+
+
+def bench_uf(backend, n, seed):
+    """ n random unions followed by n random connected queries """
+    rng = random.Random(seed)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(2 * n)]
+    start = time.perf_counter()
+    uf = UF_BACKENDS[backend](n)
+    for p, q in pairs[:n]:
+        uf.union(p, q)
+    for p, q in pairs[n:]:
+        uf.connected(p, q)
+    return 2 * n, time.perf_counter() - start
+
+
+def bench_percolation(backend, n, seed):
+    """ Open every site of n-by-n grid in random order, asking is_percolates
+        after every open, then ask is_full for every site
+    """
+    rng = random.Random(seed)
+    sites = [(row, col) for row in range(n) for col in range(n)]
+    rng.shuffle(sites)
+    start = time.perf_counter()
+    p = Percolation(n, uf=backend)
+    for row, col in sites:
+        p.open(row, col)
+        p.is_percolates()
+    for row, col in sites:
+        p.is_full(row, col)
+    return 3 * n * n, time.perf_counter() - start
+
+
+def bench_stats(backend, n, seed, trials=20):
+    """ PercolationStats with fixed number of trials (one op per trial) """
+    start = time.perf_counter()
+    PercolationStats(n, trials, seed=seed, uf=backend)
+    return trials, time.perf_counter() - start
+
+
+BENCHMARKS = {
+    "uf": bench_uf,
+    "percolation": bench_percolation,
+    "stats": bench_stats,
+}
+
+
+def _run_case(case):
+    """ Run one (name, backend, size, seed, repeat) case and keep the best
+        time, intended for child process
+    """
+    name, backend, size, seed, repeat = case
+    bench = BENCHMARKS[name]
+    ops, seconds = min(
+        (bench(backend, size, seed) for _ in range(repeat)),
+        key=lambda result: result[1]
+    )
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_rss //= 1024
+    return {
+        "name": name, "backend": backend, "size": size, "ops": ops,
+        "seconds": seconds, "ops_per_sec": ops / seconds,
+        "peak_rss_kb": peak_rss,
+    }
+
+
+def scaling_exponent(results):
+    """ Least squares slope of log(seconds) over log(size) """
+    points = [(math.log(r["size"]), math.log(r["seconds"])) for r in results]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return sxy / sxx
+
+
+def run(names, sizes, seed, repeat=3):
+    """ Run benchmarks and return JSON-serializable report """
+    # forked child would report peak RSS of the parent as its own
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for name in names:
+        for backend in sorted(UF_BACKENDS):
+            max_size = MAX_SIZES.get((name, backend))
+            for size in sizes[name]:
+                if max_size is not None and size > max_size:
+                    continue
+                with ProcessPoolExecutor(max_workers=1,
+                                         mp_context=context) as executor:
+                    result = executor.submit(
+                        _run_case, (name, backend, size, seed, repeat)
+                    ).result()
+                results.append(result)
+                print("%-12s %-17s %8d %14.1f ops/s %10d KB" % (
+                    name, backend, size, result["ops_per_sec"],
+                    result["peak_rss_kb"]
+                ), file=sys.stderr)
+
+    scaling = {}
+    for name in names:
+        for backend in sorted(UF_BACKENDS):
+            key = "%s/%s" % (name, backend)
+            scaling[key] = scaling_exponent([
+                r for r in results
+                if r["name"] == name and r["backend"] == backend
+            ])
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+        "scaling": scaling,
+    }
+
+
+def compare(report, baseline, threshold):
+    """ Print ops/sec ratios against baseline report and return number of
+        cases slower than baseline by more than threshold (fraction)
+    """
+    def key(r):
+        return r["name"], r["backend"], r["size"]
+
+    old = {key(r): r for r in baseline["results"]}
+    regressions = 0
+    for r in report["results"]:
+        if key(r) not in old:
+            continue
+        ratio = r["ops_per_sec"] / old[key(r)]["ops_per_sec"]
+        slower = ratio < 1 - threshold
+        regressions += slower
+        print("%-12s %-17s %8d %8.2fx%s" % (
+            r["name"], r["backend"], r["size"], ratio,
+            "  REGRESSION" if slower else ""
+        ), file=sys.stderr)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark union-find and percolation hot paths"
+    )
+    parser.add_argument("names", nargs="*", metavar="name",
+                        help="benchmarks to run: %s (default: all)" % (
+                            ", ".join(sorted(BENCHMARKS))))
+    parser.add_argument("--quick", action="store_true",
+                        help="use smaller sizes")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seed of every case (default: 1)")
+    parser.add_argument("--output", help="write JSON report to this file")
+    parser.add_argument("--baseline",
+                        help="JSON report of earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown fraction reported as regression "
+                             "(default: 0.1)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="best of this many runs per case (default: 3)")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: %s" % ", ".join(sorted(unknown)))
+
+    report = run(args.names or sorted(BENCHMARKS),
+                 QUICK_SIZES if args.quick else SIZES, args.seed, args.repeat)
+    for key, exponent in sorted(report["scaling"].items()):
+        if exponent is not None:
+            print("scaling %-30s n^%.2f" % (key, exponent), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
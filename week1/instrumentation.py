@@ -0,0 +1,174 @@
+# coding=utf8
+import collections
+import pstats
+
+
+class Probe(object):
+    """
+    Counters of hot-path calls of union-find structures and Percolation.
+
+    A probe is attached to single objects by replacing their methods with
+    counting wrappers on the instance, so classes are never touched and
+    objects without a probe run at full speed.
+
+    Counted events are calls of find, union and _validate_index of union-find
+    structure, lengths of paths from sites to their roots (for structures
+    with parent links), opens of Percolation sites together with unions made
+    by them, and calls of Percolation._validate_indexes.
+    """
+
+    def __init__(self):
+        self._counters = collections.Counter()
+        # number of root lookups for every path length
+        self._path_lengths = collections.Counter()
+
+    def attach_uf(self, uf):
+        """ Start counting calls of union-find structure uf; return uf """
+        counters, lengths = self._counters, self._path_lengths
+        find, union = uf.find, uf.union
+        validate_index = uf._validate_index
+
+        def counting_find(p):
+            counters["find"] += 1
+            return find(p)
+
+        def counting_union(p, q):
+            counters["union"] += 1
+            return union(p, q)
+
+        def counting_validate_index(idx):
+            counters["validate_index"] += 1
+            return validate_index(idx)
+
+        uf.find, uf.union = counting_find, counting_union
+        uf._validate_index = counting_validate_index
+
+        root = getattr(uf, "_root", None)
+        if root is not None and hasattr(uf, "_parent"):
+            def measuring_root(p):
+                # walk the path without changing it, then let _root do the
+                # real (possibly compressing) walk
+                parent, q, length = uf._parent, p, 0
+                while q != parent[q]:
+                    q = parent[q]
+                    length += 1
+                lengths[length] += 1
+                return root(p)
+
+            uf._root = measuring_root
+        return uf
+
+    def attach_percolation(self, percolation):
+        """ Start counting calls of Percolation and its union-find structure;
+            return percolation
+        """
+        counters = self._counters
+        self.attach_uf(percolation._uf)
+        open_site = percolation.open
+        validate_indexes = percolation._validate_indexes
+
+        def counting_open(row, col):
+            counters["open"] += 1
+            unions = counters["union"]
+            open_site(row, col)
+            counters["open_unions"] += counters["union"] - unions
+
+        def counting_validate_indexes(row, col):
+            counters["validate_indexes"] += 1
+            return validate_indexes(row, col)
+
+        percolation.open = counting_open
+        percolation._validate_indexes = counting_validate_indexes
+        return percolation
+
+    def add(self, stats):
+        """ Add counters from stats dict of another probe (for example, one
+            from a worker process)
+        """
+        for name, value in stats["counters"].items():
+            self._counters[name] += value
+        for length, count in stats["path_lengths"].items():
+            self._path_lengths[length] += count
+
+    def stats(self):
+        """ Return dict with counters, histogram of path lengths and their
+            mean and maximum (None when no path was measured)
+        """
+        lengths = self._path_lengths
+        paths = sum(lengths.values())
+        return {
+            "counters": dict(self._counters),
+            "path_lengths": dict(sorted(lengths.items())),
+            "mean_path_length": (
+                sum(length * count for length, count in lengths.items()) /
+                paths if paths else None
+            ),
+            "max_path_length": max(lengths) if paths else None,
+        }
+
+
+class _ProfileData(object):
+    """ Raw cProfile data in form pstats.Stats can load (and which, unlike
+        profiler itself, can be sent between processes)
+    """
+
+    def __init__(self, stats):
+        # pstats.Stats keeps and updates the dict it loads
+        self.stats = dict(stats)
+
+    def create_stats(self):
+        pass
+
+
+def merge_profiles(profiles, stats=None):
+    """ Add raw stats dicts of cProfile.Profile (after create_stats) to
+        pstats.Stats object stats and return it (new one if stats is None)
+    """
+    for profile in profiles:
+        if stats is None:
+            stats = pstats.Stats(_ProfileData(profile))
+        else:
+            stats.add(_ProfileData(profile))
+    return stats
+
+
+if __name__ == "__main__":
+    import cProfile
+
+    from percolation import Percolation
+    from quick_find_uf import QuickFindUF
+    from weighted_quick_union_uf import WeightedQuickUnionUF
+
+    probe = Probe()
+    uf = probe.attach_uf(WeightedQuickUnionUF(8))
+    uf.union(0, 1)
+    uf.union(2, 3)
+    uf.union(1, 3)
+    assert uf.connected(0, 2)
+    assert uf.union_many([(4, 5), (5, 6)]) == bytearray([1, 1])
+    stats = probe.stats()
+    assert stats["counters"] == {"union": 3, "find": 8, "validate_index": 8}
+    assert sum(stats["path_lengths"].values()) == 12
+    assert stats["max_path_length"] == 1
+
+    uf = probe.attach_uf(QuickFindUF(4))
+    uf.union(0, 1)
+    assert probe.stats()["counters"]["union"] == 4
+
+    probe = Probe()
+    p = probe.attach_percolation(Percolation(3))
+    p.open(0, 1)
+    p.open(1, 1)
+    p.open(1, 0)
+    p.open(1, 0)
+    counters = probe.stats()["counters"]
+    assert counters["open"] == 4 and counters["open_unions"] == 2
+    assert counters["validate_indexes"] == 4
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    Percolation(10).open(5, 5)
+    profiler.disable()
+    profiler.create_stats()
+    report = merge_profiles([profiler.stats, profiler.stats])
+    assert report.total_calls == 2 * pstats.Stats(profiler).total_calls
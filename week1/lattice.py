@@ -0,0 +1,379 @@
+# coding=utf8
+from percolation import _BOTTOM, _TOP, DEFAULT_UF, resolve_uf
+
+# bits of the state byte kept for every site: side flags of Percolation
+# (valid on union-find roots only), open flag and, in bond percolation, open
+# flags of bonds to the next site along every axis
+_SIDES = _TOP | _BOTTOM
+_OPEN = 4
+_BOND_SHIFT = 3
+# bond flags must fit into the rest of the byte
+MAX_BOND_DIMENSIONS = 8 - _BOND_SHIFT
+
+
+class LatticePercolation(object):
+    """ Model of percolation system on rectangular lattice of any dimension.
+
+        Sites are named by coordinate tuples (row, col) on 2-d lattice,
+        (layer, row, col) on 3-d one and so on; neighbors of a site differ in
+        one coordinate by one. Top and bottom are the first and the last
+        layer along the first axis: system percolates if some cluster of
+        connected open sites touches both of them.
+
+        In site percolation sites are opened one by one. In bond percolation
+        all sites are open and bonds between neighboring sites are opened
+        instead; bond along axis k of a site connects it with the next site
+        along that axis.
+
+        Everything about a site is kept in one byte: its open flag, open
+        flags of its bonds and, for union-find roots, flags telling whether
+        the cluster touches top and/or bottom. Together with union-find
+        structure from UF_BACKENDS that is the only per-site storage.
+        Neighbor offsets are precomputed for every axis and coordinate, so
+        opening a site needs no boundary checks.
+    """
+
+    def __init__(self, shape, periodic=False, bond=False, uf=DEFAULT_UF):
+        """ Create percolation model on lattice with given shape (tuple of
+            lengths along every axis) with all sites (or bonds) blocked.
+
+            periodic=True wraps every axis but the first one, along which
+            percolation is measured (boundaries of a cylinder or a torus);
+            tuple of flags per axis chooses wrapped axes explicitly.
+
+            uf is a name from UF_BACKENDS or a union-find class with
+            find/union/connected/count methods.
+        """
+        shape = tuple(shape)
+        if not shape or min(shape) < 1:
+            raise ValueError("Expected non-empty shape of positive lengths, "
+                             "got %r" % (shape,))
+        if periodic is True or periodic is False:
+            periodic = (False,) + (periodic,) * (len(shape) - 1)
+        periodic = tuple(bool(flag) for flag in periodic)
+        if len(periodic) != len(shape):
+            raise ValueError("Expected %d periodic flags, got %r" % (
+                len(shape), periodic
+            ))
+        if bond and len(shape) > MAX_BOND_DIMENSIONS:
+            raise ValueError(
+                "Bond percolation supports at most %d dimensions" %
+                MAX_BOND_DIMENSIONS
+            )
+        self._uf_name, uf_class = resolve_uf(uf)
+
+        self._shape = shape
+        self._periodic = periodic
+        self._bond = bond
+        self._uf_class = uf_class
+
+        # row-major strides and number of sites
+        strides, sites = [], 1
+        for length in reversed(shape):
+            strides.append(sites)
+            sites *= length
+        self._strides = tuple(reversed(strides))
+        self._sites = sites
+        # sites of the top layer are [0, _layer), bottom: [_bottom, _sites)
+        self._layer = self._strides[0]
+        self._bottom = sites - self._layer
+
+        # for every axis (stride, length, per-coordinate tables): offsets
+        # of all neighbors and offset of the next site (None at the edge)
+        self._axes = []
+        for stride, length, wrap in zip(self._strides, shape, periodic):
+            span = stride * (length - 1)
+            backward = [-stride] * length
+            forward = [stride] * length
+            backward[0] = span if wrap else None
+            forward[-1] = -span if wrap else None
+            neighbors = []
+            for back, ahead in zip(backward, forward):
+                offsets = []
+                for offset in (back, ahead):
+                    # a site is no neighbor to itself, and with wrapped axis
+                    # of length 2 both offsets lead to the same site
+                    if offset and offset not in offsets:
+                        offsets.append(offset)
+                neighbors.append(tuple(offsets))
+            self._axes.append((stride, length, neighbors, forward))
+
+        self._state = bytearray(sites)
+        self._uf = uf_class(sites)
+        self._start()
+
+    def _start(self):
+        """ Set up state bytes and counters for lattice with all sites (or
+            bonds) blocked and fresh union-find structure
+        """
+        self._open_count = 0
+        self._percolates = False
+        if not self._bond:
+            return
+
+        # every site is open and is a cluster on its own
+        state, layer, bottom = self._state, self._layer, self._bottom
+        state[:] = bytes((_OPEN,)) * self._sites
+        state[:layer] = bytes((_OPEN | _TOP,)) * layer
+        for site in range(bottom, self._sites):
+            state[site] |= _BOTTOM
+        self._percolates = bottom == 0
+
+    def reset(self):
+        """ Block all sites (or bonds) again, reusing allocated storage """
+        if not self._bond:
+            self._state[:] = bytes(self._sites)
+        if hasattr(self._uf, "reset"):
+            self._uf.reset()
+        else:
+            self._uf = self._uf_class(self._sites)
+        self._start()
+
+    def shape(self):
+        """ Return tuple of lengths of the lattice along every axis """
+        return self._shape
+
+    def periodic(self):
+        """ Return tuple of flags telling which axes are wrapped """
+        return self._periodic
+
+    def uf_backend(self):
+        """ Return name of union-find backend used by this model """
+        return self._uf_name
+
+    def number_of_sites(self):
+        """ Return number of sites of the lattice """
+        return self._sites
+
+    def number_of_bonds(self):
+        """ Return number of bond indexes, some of which (at the edges of
+            not wrapped axes) lead nowhere
+        """
+        return self._sites * len(self._shape)
+
+    def _index(self, coords):
+        """ Validate coordinates and return index of the site """
+        if len(coords) != len(self._shape):
+            raise IndexError("Expected %d coordinates, got %r" % (
+                len(self._shape), coords
+            ))
+        site = 0
+        for coord, length, stride in zip(coords, self._shape, self._strides):
+            if coord < 0 or coord >= length:
+                raise IndexError(
+                    "Incorrect position %r in lattice of shape %r" % (
+                        coords, self._shape
+                    )
+                )
+            site += coord * stride
+        return site
+
+    def index(self, *coords):
+        """ Return index of the site at given coordinates (sites are indexed
+            row by row, from 0 to number_of_sites() - 1)
+        """
+        return self._index(coords)
+
+    def coords(self, site):
+        """ Return coordinates of the site with given index """
+        if site < 0 or site >= self._sites:
+            raise IndexError("Site %d is not between 0 and %d" % (
+                site, self._sites - 1
+            ))
+        return tuple(site // stride % length
+                     for stride, length, _, _ in self._axes)
+
+    def _validate_site_mode(self):
+        """ Validate that sites are opened one by one (site percolation) """
+        if self._bond:
+            raise ValueError("Sites are always open in bond percolation")
+
+    def _validate_bond_mode(self):
+        """ Validate that bonds are opened (bond percolation) """
+        if not self._bond:
+            raise ValueError("Bonds are only opened in bond percolation")
+
+    def open(self, *coords):
+        """ Open site at given coordinates if it is not open already """
+        self._validate_site_mode()
+        self.open_site(self._index(coords))
+
+    def open_site(self, site):
+        """ Open site with given index (see index()) if it is not open
+            already; the index is not validated
+        """
+        state = self._state
+        if state[site] & _OPEN:
+            return
+        self._open_count += 1
+        flags = (_TOP if site < self._layer else 0) | (
+            _BOTTOM if site >= self._bottom else 0
+        )
+        state[site] = _OPEN | flags
+
+        uf = self._uf
+        for stride, length, neighbors, _ in self._axes:
+            for offset in neighbors[site // stride % length]:
+                neighbor = site + offset
+                if state[neighbor] & _OPEN:
+                    flags |= state[uf.find(neighbor)]
+                    uf.union(site, neighbor)
+        self._merged(site, flags & _SIDES)
+
+    def _merged(self, site, flags):
+        """ Store side flags of cluster which site has just joined """
+        root = self._uf.find(site)
+        self._state[root] |= flags
+        if flags == _SIDES:
+            self._percolates = True
+
+    def open_bond(self, axis, *coords):
+        """ Open bond between site at given coordinates and the next site
+            along axis
+        """
+        self._validate_bond_mode()
+        if axis < 0 or axis >= len(self._shape):
+            raise IndexError("Axis %d is not between 0 and %d" % (
+                axis, len(self._shape) - 1
+            ))
+        self.open_bond_index(self._index(coords) * len(self._shape) + axis)
+
+    def open_bond_index(self, bond):
+        """ Open bond with given index (site index * dimensions + axis) if it
+            is not open already. Raises IndexError for bonds at the edges of
+            not wrapped axes, which lead nowhere.
+        """
+        self._validate_bond_mode()
+        site, axis = divmod(bond, len(self._shape))
+        stride, length, _, forward = self._axes[axis]
+        if site < 0 or site >= self._sites:
+            raise IndexError("Bond %d is not between 0 and %d" % (
+                bond, self.number_of_bonds() - 1
+            ))
+        offset = forward[site // stride % length]
+        if offset is None:
+            raise IndexError("Bond %d leads out of the lattice" % bond)
+
+        state, bit = self._state, 1 << (_BOND_SHIFT + axis)
+        if state[site] & bit:
+            return
+        state[site] |= bit
+        self._open_count += 1
+
+        uf, neighbor = self._uf, site + offset
+        flags = state[uf.find(site)] | state[uf.find(neighbor)]
+        uf.union(site, neighbor)
+        self._merged(site, flags & _SIDES)
+
+    def is_open(self, *coords):
+        """ Return True if site at given coordinates is open """
+        return self._state[self._index(coords)] & _OPEN != 0
+
+    def is_bond_open(self, axis, *coords):
+        """ Return True if bond from site at given coordinates to the next
+            site along axis is open
+        """
+        self._validate_bond_mode()
+        if axis < 0 or axis >= len(self._shape):
+            raise IndexError("Axis %d is not between 0 and %d" % (
+                axis, len(self._shape) - 1
+            ))
+        bit = 1 << (_BOND_SHIFT + axis)
+        return self._state[self._index(coords)] & bit != 0
+
+    def is_full(self, *coords):
+        """ Return True if site at given coordinates is open and connected to
+            top layer
+        """
+        site = self._index(coords)
+        return (self._state[site] & _OPEN != 0 and
+                self._state[self._uf.find(site)] & _TOP != 0)
+
+    def number_of_open_sites(self):
+        """ Return number of open sites (all of them in bond percolation) """
+        return self._sites if self._bond else self._open_count
+
+    def number_of_open_bonds(self):
+        """ Return number of open bonds """
+        self._validate_bond_mode()
+        return self._open_count
+
+    def is_percolates(self):
+        """ Return True if system percolates """
+        return self._percolates
+
+
+if __name__ == "__main__":
+    import random
+
+    from percolation import Percolation
+
+    # on square lattice the model agrees with Percolation
+    rng = random.Random(1)
+    for _ in range(20):
+        n = rng.randint(1, 8)
+        p, q = Percolation(n), LatticePercolation((n, n))
+        for _ in range(n * n):
+            row, col = rng.randrange(n), rng.randrange(n)
+            p.open(row, col)
+            q.open(row, col)
+            assert p.is_percolates() == q.is_percolates()
+        assert q.number_of_open_sites() == p.number_of_open_sites()
+        assert all(p.is_full(row, col) == q.is_full(row, col)
+                   for row in range(n) for col in range(n))
+
+    # rectangular and 3-d lattices
+    q = LatticePercolation((3, 5))
+    for row in range(3):
+        q.open(row, 4)
+    assert q.is_percolates() and not q.is_full(0, 0)
+    q = LatticePercolation((3, 2, 2))
+    assert q.coords(q.index(2, 1, 0)) == (2, 1, 0)
+    q.open(0, 0, 0)
+    q.open(1, 0, 0)
+    q.open(1, 1, 1)
+    assert not q.is_percolates()
+    q.open(1, 0, 1)
+    q.open(2, 1, 1)
+    assert q.is_percolates() and q.is_full(2, 1, 1)
+    q.reset()
+    assert not q.is_percolates() and not q.is_open(0, 0, 0)
+
+    # periodic boundary connects the first and the last column
+    for periodic in (False, True):
+        q = LatticePercolation((2, 4), periodic=periodic)
+        q.open(0, 3)
+        q.open(1, 3)
+        q.open(1, 0)
+        assert q.is_full(1, 0) == periodic
+    assert LatticePercolation((2, 2), periodic=(True, True)).periodic() == (
+        True, True
+    )
+
+    # bond percolation
+    q = LatticePercolation((3, 3), bond=True)
+    assert q.number_of_open_sites() == 9 and not q.is_full(1, 1)
+    q.open_bond(0, 0, 1)
+    assert q.is_full(1, 1) and not q.is_percolates()
+    assert q.is_bond_open(0, 0, 1) and not q.is_bond_open(1, 0, 1)
+    q.open_bond(1, 1, 0)
+    q.open_bond(1, 1, 0)
+    assert q.is_full(1, 0) and not q.is_full(2, 0)
+    q.open_bond(0, 1, 0)
+    assert q.is_percolates() and q.number_of_open_bonds() == 3
+    for bad in ((0, 2, 0), (1, 0, 2)):
+        try:
+            q.open_bond(*bad)
+        except IndexError:
+            pass
+        else:
+            raise AssertionError("IndexError expected for %r" % (bad,))
+    q = LatticePercolation((2, 2), periodic=True, bond=True)
+    q.open_bond(1, 0, 1)
+    assert q.number_of_open_bonds() == 1
+    try:
+        q.open(0, 0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ValueError expected")
@@ -0,0 +1,280 @@
+# coding=utf8
+import mmap
+import struct
+import sys
+
+from uf_cli import main
+from uf_pairs import split_pairs, validate_pairs
+
+# file starts with header: magic, typecode of arrays, their byte order, clean
+# flag (cleared while the file is open for writing), n and count
+_HEADER = struct.Struct("<4sccBxQQ8x")
+_MAGIC = b"MUF1"
+_BYTEORDER = b"<" if sys.byteorder == "little" else b">"
+# sites counted at once when count is restored
+_SCAN_SIZE = 1 << 20
+
+
+class MmapUF(object):
+    """
+    The MmapUF class represents a union–find data type (also known as the
+    disjoint-sets data type) over n sites, named 0 through n–1, kept in a
+    memory-mapped file, so that n is limited by disk space rather than RAM
+    and the structure persists between runs.
+
+    This implementation uses weighted quick union by size with path halving,
+    like WeightedQuickUnionPathCompressionUF. Parent links and component
+    sizes are kept in two arrays of 32-bit integers (64-bit when n does not
+    fit) following a small header. Link of a site is stored as its parent
+    plus one, with 0 meaning the site is a root, and size is stored minus
+    one, so a file of zeros is n separate components: creating structure of
+    any size takes constant time and untouched parts of a sparse file take no
+    disk space.
+
+    Without path the arrays live in anonymous memory map, which makes a
+    compact in-memory structure.
+    """
+
+    def __init__(self, n, path=None):
+        """ Initializes an empty union–find data structure with n sites 0
+            through n-1, kept in file path (truncated if it exists) or in
+            anonymous memory map.
+        """
+        if n < 0:
+            raise ValueError("Number of sites must be non-negative, got %d" %
+                             n)
+        typecode = b"i" if n < 2 ** 31 else b"q"
+        length = _HEADER.size + 2 * n * struct.calcsize(typecode.decode())
+        if path is None:
+            self._file = None
+            data = mmap.mmap(-1, length)
+        else:
+            self._file = open(path, "w+b")
+            self._file.truncate(length)
+            data = mmap.mmap(self._file.fileno(), length)
+        _HEADER.pack_into(data, 0, _MAGIC, typecode, _BYTEORDER, 0, n, n)
+        self._attach(data, n, typecode, n)
+
+    @classmethod
+    def open(cls, path):
+        """ Reopens structure kept in file path. If the process which wrote
+            it did not close it, the count of components is recomputed.
+        """
+        f = open(path, "r+b")
+        try:
+            data = mmap.mmap(f.fileno(), 0)
+        except ValueError:
+            # empty file cannot be mapped
+            f.close()
+            raise ValueError("%s is not a union-find file" % path)
+
+        error = None
+        if len(data) < _HEADER.size:
+            error = "%s is not a union-find file"
+        else:
+            magic, typecode, byteorder, clean, n, count = (
+                _HEADER.unpack_from(data)
+            )
+            if magic != _MAGIC or typecode not in (b"i", b"q"):
+                error = "%s is not a union-find file"
+            elif byteorder != _BYTEORDER:
+                error = "%s was written on a machine with other byte order"
+            elif len(data) != _HEADER.size + 2 * n * struct.calcsize(
+                    typecode.decode()):
+                error = "%s is truncated"
+        if error is not None:
+            data.close()
+            f.close()
+            raise ValueError(error % path)
+
+        uf = cls.__new__(cls)
+        uf._file = f
+        uf._attach(data, n, typecode, count)
+        if not clean:
+            uf._count = uf._recount()
+        return uf
+
+    def _attach(self, data, n, typecode, count):
+        """ Map arrays onto memory map data and mark file as open """
+        itemsize = struct.calcsize(typecode.decode())
+        self._data = data
+        self._count = count
+        self._n = n
+        view = memoryview(data)
+        start, middle = _HEADER.size, _HEADER.size + n * itemsize
+        self._links = view[start:middle].cast(typecode.decode())
+        self._sizes = view[middle:middle + n * itemsize].cast(
+            typecode.decode()
+        )
+        self._write_header(clean=False)
+
+    def _write_header(self, clean):
+        _HEADER.pack_into(self._data, 0, _MAGIC,
+                          self._links.format.encode(), _BYTEORDER,
+                          1 if clean else 0, self._n, self._count)
+
+    def _recount(self):
+        """ Count roots, a chunk of sites at a time """
+        links, roots = self._links, 0
+        for start in range(0, self._n, _SCAN_SIZE):
+            roots += links[start:start + _SCAN_SIZE].tolist().count(0)
+        return roots
+
+    def flush(self):
+        """ Writes count and all changes to the file """
+        self._write_header(clean=False)
+        self._data.flush()
+
+    def close(self):
+        """ Writes all changes to the file and closes it """
+        if self._data is None:
+            return
+        self._write_header(clean=True)
+        self._data.flush()
+        self._links.release()
+        self._sizes.release()
+        self._data.close()
+        self._data = None
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def reset(self):
+        """ Reinitializes the structure in place, making every site a
+            separate component again.
+        """
+        self._count = self._n
+        with memoryview(self._data) as view:
+            # zero both arrays a few megabytes at a time
+            step = _SCAN_SIZE * 8
+            zeros = bytes(min(len(view) - _HEADER.size, step))
+            for start in range(_HEADER.size, len(view), step):
+                with view[start:start + step] as chunk:
+                    chunk[:] = zeros[:len(chunk)]
+
+    def _validate_index(self, idx):
+        """ Validate that p is a valid index """
+        n = self._n
+        if idx < 0 or idx >= n:
+            raise IndexError("Index %d is not between 0 and %d" % (idx, n - 1))
+
+    def _root(self, p):
+        """ Returns the root of site p, halving the path on the way up """
+        links = self._links
+        while True:
+            up = links[p]
+            if up == 0:
+                return p
+            grand = links[up - 1]
+            if grand == 0:
+                return up - 1
+            links[p] = grand
+            p = grand - 1
+
+    def connected(self, p, q):
+        """ Returns True if the sites p and q are in the same component. """
+        return self.find(p) == self.find(q)
+
+    def count(self):
+        """ Returns the number of components """
+        return self._count
+
+    def find(self, p):
+        """ Returns the component identifier for the component containing
+            site p.
+        """
+        self._validate_index(p)
+        return self._root(p)
+
+    def _link(self, rootP, rootQ):
+        """ Make smaller of two different roots point to larger one """
+        sizes = self._sizes
+        if sizes[rootP] < sizes[rootQ]:
+            rootP, rootQ = rootQ, rootP
+        self._links[rootQ] = rootP + 1
+        sizes[rootP] += sizes[rootQ] + 1
+
+    def union(self, p, q):
+        """ Merges the component containing site p with the the component
+            containing site q.
+        """
+        rootP = self.find(p)
+        rootQ = self.find(q)
+        if rootP == rootQ:
+            return
+        self._link(rootP, rootQ)
+        self._count -= 1
+
+    def connected_many(self, pairs):
+        """ Returns bytearray with 1 for every pair (p, q) of sites which are
+            in the same component and 0 otherwise.
+        """
+        ps, qs = split_pairs(pairs)
+        validate_pairs(ps, qs, self._n)
+        root = self._root
+        return bytearray(root(p) == root(q) for p, q in zip(ps, qs))
+
+    def union_many(self, pairs):
+        """ Merges components for every pair (p, q) of sites in order.
+
+            Returns bytearray with 1 for every pair which merged two different
+            components. Sites are validated once for the whole batch.
+        """
+        ps, qs = split_pairs(pairs)
+        validate_pairs(ps, qs, self._n)
+        root, link = self._root, self._link
+        merged = bytearray(len(ps))
+        for i, (p, q) in enumerate(zip(ps, qs)):
+            rootP, rootQ = root(p), root(q)
+            if rootP != rootQ:
+                link(rootP, rootQ)
+                merged[i] = 1
+        self._count -= sum(merged)
+        return merged
+
+    def union_stream(self, batches):
+        """ Merges components for pairs coming in batches (anything
+            union_many accepts), so that input of any size is processed in
+            bounded memory. Returns number of merges.
+        """
+        merges = 0
+        for batch in batches:
+            merges += sum(self.union_many(batch))
+        return merges
+
+
+def read_pairs(path, typecode="i", batch_pairs=1 << 20):
+    """ Yield batches of at most batch_pairs pairs from binary file of
+        native integers of given typecode (p0, q0, p1, q1, ...), as flat
+        memoryviews of the file mapped into memory; every batch is valid
+        until the next one is requested. Trailing bytes which do not make a
+        whole pair are ignored.
+    """
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            return
+    with data, memoryview(data) as view:
+        itemsize = struct.calcsize(typecode)
+        step = 2 * itemsize * batch_pairs
+        end = len(view) - len(view) % (2 * itemsize)
+        for start in range(0, end, step):
+            with view[start:min(start + step, end)] as chunk:
+                with chunk.cast(typecode) as batch:
+                    yield batch
+
+
+if __name__ == "__main__":
+    # Reads in a sequence of pairs of integers (between 0 and n-1) from
+    # standard input or file, where each integer represents some site; if the
+    # sites are in different components, merge the two components and print
+    # the pair to standard output (see --help for bulk and quiet modes and
+    # for --file, which keeps the structure in a file for MmapUF.open).
+    main(MmapUF, backing_file=True)
@@ -0,0 +1,115 @@
+# coding=utf8
+import math
+from statistics import StatisticsError
+
+
+class OnlineStats(object):
+    """
+    The OnlineStats class accumulates sample mean and variance of a stream of
+    values using Welford's algorithm. Every push takes constant time and the
+    accumulator takes constant memory regardless of number of values.
+
+    Two accumulators can be merged (Chan et al. pairwise update), so partial
+    results computed in different processes reduce to the same statistics.
+    """
+
+    def __init__(self):
+        """ Initializes an empty accumulator """
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, x):
+        """ Adds value x to the sample """
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+    def merge(self, other):
+        """ Adds all values accumulated by other OnlineStats to the sample """
+        if other._count == 0:
+            return
+        count = self._count + other._count
+        delta = other._mean - self._mean
+        self._mean += delta * other._count / count
+        self._m2 += (other._m2 +
+                     delta * delta * self._count * other._count / count)
+        self._count = count
+
+    def count(self):
+        """ Returns the number of values in the sample """
+        return self._count
+
+    def mean(self):
+        """ Sample mean """
+        if self._count < 1:
+            raise StatisticsError("mean requires at least one data point")
+        return self._mean
+
+    def variance(self):
+        """ Sample variance """
+        if self._count < 2:
+            raise StatisticsError("variance requires at least two data points")
+        return self._m2 / (self._count - 1)
+
+    def stdev(self):
+        """ Sample standard deviation """
+        return math.sqrt(self.variance())
+
+    def half_width(self, z=1.96):
+        """ Half-width of confidence interval for the mean (95% by default) """
+        return z * self.stdev() / math.sqrt(self._count)
+
+
+def wilson_interval(successes, trials, z=1.96):
+    """ Returns Wilson score interval (low, high) for probability of success
+        observed successes times in trials (95% by default). Unlike normal
+        approximation it stays within [0, 1] and keeps positive width when
+        all or none of the trials succeeded.
+    """
+    if trials < 1:
+        raise StatisticsError("interval requires at least one trial")
+    p, zz = successes / trials, z * z
+    scale = 1 + zz / trials
+    center = (p + zz / (2 * trials)) / scale
+    half = z * math.sqrt(p * (1 - p) / trials +
+                         zz / (4 * trials * trials)) / scale
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+if __name__ == "__main__":
+    import statistics
+
+    data = [0.5, 0.61, 0.58, 0.6, 0.55, 0.63]
+    s = OnlineStats()
+    for x in data:
+        s.push(x)
+    assert s.count() == 6
+    assert abs(s.mean() - statistics.mean(data)) < 1e-12
+    assert abs(s.stdev() - statistics.stdev(data)) < 1e-12
+
+    left, right = OnlineStats(), OnlineStats()
+    for x in data[:2]:
+        left.push(x)
+    for x in data[2:]:
+        right.push(x)
+    left.merge(right)
+    assert left.count() == 6
+    assert abs(left.mean() - s.mean()) < 1e-12
+    assert abs(left.variance() - s.variance()) < 1e-12
+
+    for call in (OnlineStats().mean, lambda: wilson_interval(0, 0)):
+        try:
+            call()
+        except StatisticsError:
+            pass
+        else:
+            raise AssertionError("StatisticsError expected")
+
+    low, high = wilson_interval(0, 20)
+    assert low == 0.0 and 0.16 < high < 0.17
+    low, high = wilson_interval(20, 20)
+    assert 0.83 < low < 0.84 and high == 1.0
+    low, high = wilson_interval(1, 2)
+    assert 0 < low < 0.5 < high < 1 and abs(low + high - 1) < 1e-12
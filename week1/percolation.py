@@ -1,7 +1,47 @@
 # coding=utf8
-# from quick_find_uf import QuickFindUF
+import sys
+from array import array
+
+from mmap_uf import MmapUF
+from quick_find_uf import QuickFindUF
+from weighted_quick_union_path_compression_uf import (
+    WeightedQuickUnionPathCompressionUF
+)
 from weighted_quick_union_uf import WeightedQuickUnionUF
 
+# union-find implementations Percolation can be built on, by name
+UF_BACKENDS = {
+    "quick_find": QuickFindUF,
+    "weighted": WeightedQuickUnionUF,
+    "path_compression": WeightedQuickUnionPathCompressionUF,
+    "mmap": MmapUF,
+}
+# fastest backend in percolation benchmark (see benchmark.py)
+DEFAULT_UF = "weighted"
+
+
+# flags kept for every union-find root in backwash-free mode (and by
+# LatticePercolation)
+_TOP = 1
+_BOTTOM = 2
+
+
+def resolve_uf(uf):
+    """ Return (name, class) of union-find backend uf, which is a name from
+        UF_BACKENDS or a union-find class
+    """
+    if isinstance(uf, str):
+        if uf not in UF_BACKENDS:
+            raise ValueError("Unknown union-find backend %r" % uf)
+        return uf, UF_BACKENDS[uf]
+    return uf.__name__, uf
+
+
+def _zero(buffer):
+    """ Fill buffer (bytearray or array) with zeros in place """
+    view = memoryview(buffer).cast("B")
+    view[:] = bytes(len(view))
+
 
 class Percolation(object):
     """ Model of percolation system with n-by-n grid of sites.
@@ -16,19 +56,90 @@ class Percolation(object):
         to top row and that process fills some open site on bottom row.
     """
 
-    def __init__(self, n):
-        """ Create percolation model with n-by-n grid and all sites blocked """
+    def __init__(self, n, virtual_sites=False, uf=DEFAULT_UF):
+        """ Create percolation model with n-by-n grid and all sites blocked.
+
+            By default every union-find root carries flags telling whether
+            its component touches top and/or bottom row, which keeps is_full
+            free of backwash at the cost of one byte per site.
+
+            With virtual_sites=True the classic design is used instead:
+            virtual top and bottom sites are connected to whole top and bottom
+            rows, so after system percolates bottom sites connected only
+            through virtual bottom site are reported full (backwash).
+
+            uf is a name from UF_BACKENDS or a union-find class with
+            find/union/connected/count methods.
+        """
+        self._uf_name, uf_class = resolve_uf(uf)
+
         self._n = n
-        self._grid = [[False] * n for _ in range(n)]
-        # create sites for n-by-n grid and 2 "virtual" sites for top and bottom
-        # self._uf = QuickFindUF(n * n + 2)
-        self._uf = WeightedQuickUnionUF(n * n + 2)  # QuickFindUF(n * n + 2)
-        # connect top and bottom virtual sites with respecting sides of grid
-        self._top_idx = n * n
-        self._bottom_idx = n * n + 1
-        for i in range(n):
-            self._uf.union(self._top_idx, i)
-            self._uf.union(self._bottom_idx, (n - 1) * n + i)
+        self._uf_class = uf_class
+        # open flag of every site, row by row
+        self._grid = bytearray(n * n)
+
+        if not virtual_sites:
+            # _TOP/_BOTTOM flags and sizes of every cluster of open sites,
+            # indexed by its root
+            self._status = bytearray(n * n)
+            typecode = "i" if n * n < 2 ** 31 else "q"
+            self._sizes = array(typecode, [0]) * (n * n)
+            self._uf = uf_class(n * n)
+        else:
+            self._status = None
+            # create sites for n-by-n grid and 2 "virtual" sites for top and
+            # bottom
+            self._uf = uf_class(n * n + 2)
+            self._top_idx = n * n
+            self._bottom_idx = n * n + 1
+            # pairs connecting top and bottom virtual sites with respecting
+            # sides of grid (flat p0, q0, p1, q1, ...), computed once
+            self._wiring = array("i" if n * n < 2 ** 31 else "q")
+            for i in range(n):
+                self._wiring.extend((self._top_idx, i,
+                                     self._bottom_idx, (n - 1) * n + i))
+        self._start()
+
+    def _start(self):
+        """ Set up counters (and virtual sites) for grid with all sites
+            blocked and fresh union-find structure
+        """
+        self._open_count = 0
+        if self._status is not None:
+            self._percolates = False
+            self._clusters = 0
+            self._largest = 0
+            self._spanning = 0
+            return
+
+        uf, wiring = self._uf, self._wiring
+        if hasattr(uf, "union_many"):
+            uf.union_many(wiring)
+        else:
+            for p, q in zip(wiring[0::2], wiring[1::2]):
+                uf.union(p, q)
+
+    def reset(self):
+        """ Block all sites again, reusing allocated grid, cluster flags and
+            sizes, and union-find structure (when it has reset method), so
+            that one model serves many experiments
+        """
+        _zero(self._grid)
+        if self._status is not None:
+            _zero(self._status)
+            _zero(self._sizes)
+        if hasattr(self._uf, "reset"):
+            self._uf.reset()
+        else:
+            n = self._n
+            self._uf = self._uf_class(
+                n * n if self._status is not None else n * n + 2
+            )
+        self._start()
+
+    def uf_backend(self):
+        """ Return name of union-find backend used by this model """
+        return self._uf_name
 
     def _validate_indexes(self, row, col):
         """ Validate that row and col is a valid grid index """
@@ -42,38 +153,137 @@ class Percolation(object):
     def open(self, row, col):
         """ Open site on position (row, col) if it is not open already """
         self._validate_indexes(row, col)
-        self._grid[row][col] = True
-        site_idx = row * self._n + col
+        n, grid = self._n, self._grid
+        site_idx = row * n + col
+        if grid[site_idx]:
+            return
+        grid[site_idx] = 1
+        self._open_count += 1
+
+        neighbors = []
         # connect to left site
-        if col > 0 and self.is_open(row, col - 1):
-            self._uf.union(site_idx, site_idx - 1)
+        if col > 0 and grid[site_idx - 1]:
+            neighbors.append(site_idx - 1)
         # connect to right site
-        if col < self._n - 1 and self.is_open(row, col + 1):
-            self._uf.union(site_idx, site_idx + 1)
+        if col < n - 1 and grid[site_idx + 1]:
+            neighbors.append(site_idx + 1)
         # connect to upper site
-        if row > 0 and self.is_open(row - 1, col):
-            self._uf.union(site_idx, (row - 1) * self._n + col)
+        if row > 0 and grid[site_idx - n]:
+            neighbors.append(site_idx - n)
         # connect to lower site
-        if row < self._n - 1 and self.is_open(row + 1, col):
-            self._uf.union(site_idx, (row + 1) * self._n + col)
+        if row < n - 1 and grid[site_idx + n]:
+            neighbors.append(site_idx + n)
+
+        uf, status = self._uf, self._status
+        if status is None:
+            for neighbor_idx in neighbors:
+                uf.union(site_idx, neighbor_idx)
+            return
+
+        # collect flags and sizes of merged clusters before their roots
+        # change
+        flags = (_TOP if row == 0 else 0) | (_BOTTOM if row == n - 1 else 0)
+        size, roots, sizes = 1, [], self._sizes
+        for neighbor_idx in neighbors:
+            root = uf.find(neighbor_idx)
+            if root not in roots:
+                roots.append(root)
+                flags |= status[root]
+                size += sizes[root]
+            uf.union(site_idx, neighbor_idx)
+
+        root = uf.find(site_idx)
+        status[root] = flags
+        sizes[root] = size
+        self._clusters += 1 - len(roots)
+        if size > self._largest:
+            self._largest = size
+        if flags == _TOP | _BOTTOM:
+            self._percolates = True
+            if size > self._spanning:
+                self._spanning = size
 
     def is_open(self, row, col):
         """ Return True if site on position (row, col) is open """
         self._validate_indexes(row, col)
-        return self._grid[row][col]
+        return self._grid[row * self._n + col] == 1
 
     def is_full(self, row, col):
         """ Return True if site on position (row, col) is full """
         self._validate_indexes(row, col)
-        return self._uf.connected(self._top_idx, row * self._n + col)
+        site_idx = row * self._n + col
+        if self._status is None:
+            return self._uf.connected(self._top_idx, site_idx)
+        return (self._grid[site_idx] == 1 and
+                (self._status[self._uf.find(site_idx)] & _TOP) != 0)
 
     def number_of_open_sites(self):
         """ Return number of open sites in n-by-n grid """
-        return sum(sum(line) for line in self._grid)
+        return self._open_count
 
     def is_percolates(self):
         """ Return True if system percolates """
-        return self._uf.connected(self._top_idx, self._bottom_idx)
+        if self._status is None:
+            return self._uf.connected(self._top_idx, self._bottom_idx)
+        return self._percolates
+
+    def _validate_cluster_tracking(self):
+        """ Validate that cluster statistics are tracked by this model """
+        if self._status is None:
+            raise ValueError(
+                "Cluster statistics are not tracked with virtual sites"
+            )
+
+    def number_of_clusters(self):
+        """ Return number of clusters (connected groups) of open sites """
+        self._validate_cluster_tracking()
+        return self._clusters
+
+    def largest_cluster_size(self):
+        """ Return number of sites in the largest cluster """
+        self._validate_cluster_tracking()
+        return self._largest
+
+    def spanning_cluster_size(self):
+        """ Return number of sites in the largest cluster connecting top and
+            bottom rows (0 if system does not percolate)
+        """
+        self._validate_cluster_tracking()
+        return self._spanning
+
+    def snapshot(self):
+        """ Return JSON-serializable dict with current state summary (cluster
+            statistics are None with virtual sites)
+        """
+        tracked = self._status is not None
+        return {
+            "n": self._n,
+            "open_sites": self._open_count,
+            "percolates": self.is_percolates(),
+            "clusters": self._clusters if tracked else None,
+            "largest_cluster": self._largest if tracked else None,
+            "spanning_cluster": self._spanning if tracked else None,
+        }
+
+    def memory_footprint(self):
+        """ Return approximate number of bytes used by the grid (with
+            cluster flags and sizes) and by the union-find structure (list
+            items are counted as separate int objects, so list-backed
+            structures get an upper bound)
+        """
+        def sizeof(value):
+            size = sys.getsizeof(value)
+            if isinstance(value, list):
+                size += sum(sys.getsizeof(item) for item in value)
+            return size
+
+        grid = sizeof(self._grid)
+        if self._status is not None:
+            grid += sizeof(self._status) + sizeof(self._sizes)
+        uf = sizeof(self._uf) + sum(
+            sizeof(value) for value in vars(self._uf).values()
+        )
+        return {"grid": grid, "uf": uf, "total": grid + uf}
 
 
 if __name__ == "__main__":
@@ -91,5 +301,129 @@ if __name__ == "__main__":
     assert not p.is_percolates()
     p.open(2, 2)
     assert p.number_of_open_sites() == 5
+    p.open(2, 2)
+    assert p.number_of_open_sites() == 5
     assert p.is_full(2, 2)
     assert p.is_percolates()
+
+    # backwash: (2, 0) is connected to top only through the bottom row
+    for virtual_sites in (False, True):
+        p = Percolation(3, virtual_sites=virtual_sites)
+        for row in range(3):
+            p.open(row, 2)
+        p.open(2, 0)
+        assert p.is_percolates()
+        assert p.is_full(2, 0) == virtual_sites
+        assert not p.is_full(0, 0) or virtual_sites
+
+    for uf in sorted(UF_BACKENDS):
+        p = Percolation(3, uf=uf)
+        assert p.uf_backend() == uf
+        for row in range(3):
+            p.open(row, 1)
+        assert p.is_percolates()
+        assert not p.is_full(0, 0)
+
+    # cluster statistics
+    p = Percolation(4)
+    for row, col in ((0, 0), (1, 0), (3, 3), (0, 2), (1, 2), (2, 2)):
+        p.open(row, col)
+    assert p.number_of_clusters() == 3
+    assert p.largest_cluster_size() == 3
+    assert p.spanning_cluster_size() == 0
+    p.open(1, 1)
+    assert p.number_of_clusters() == 2
+    assert p.largest_cluster_size() == 6
+    p.open(3, 2)
+    assert p.snapshot() == {
+        "n": 4, "open_sites": 8, "percolates": True, "clusters": 1,
+        "largest_cluster": 8, "spanning_cluster": 8,
+    }
+
+    p.reset()
+    assert p.snapshot() == {
+        "n": 4, "open_sites": 0, "percolates": False, "clusters": 0,
+        "largest_cluster": 0, "spanning_cluster": 0,
+    }
+    p.open(0, 3)
+    assert p.largest_cluster_size() == 1 and not p.is_full(3, 3)
+    p = Percolation(3, virtual_sites=True)
+    for row in range(3):
+        p.open(row, 0)
+    assert p.is_percolates()
+    p.reset()
+    assert not p.is_percolates() and not p.is_open(1, 0)
+    for uf in sorted(UF_BACKENDS):
+        p = Percolation(4, virtual_sites=True, uf=uf)
+        p.open(1, 1)
+        p.reset()
+        # top and bottom virtual sites with their rows, and the rest
+        assert p._uf.count() == 2 + 2 * 4, uf
+
+    p = Percolation(1)
+    assert not p.is_percolates()
+    p.open(0, 0)
+    assert p.is_full(0, 0)
+    assert p.is_percolates()
+
+    # mmap_uf.py runs the union-find client, so MmapUF is tested here
+    import os
+    import tempfile
+
+    from mmap_uf import read_pairs
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "uf.bin")
+        with MmapUF(10, path) as uf:
+            uf.union(1, 2)
+            uf.union(3, 4)
+            assert uf.union_many([(2, 4), (5, 6), (1, 3)]) == bytearray(
+                [1, 1, 0]
+            )
+            assert uf.count() == 6
+
+        # reopen closed file, then one left open (count is recounted)
+        uf = MmapUF.open(path)
+        assert uf.count() == 6 and uf.connected(1, 4)
+        assert uf.connected_many([(1, 4), (4, 5)]) == bytearray([1, 0])
+        uf.union(0, 9)
+        uf.flush()
+        reopened = MmapUF.open(path)
+        assert reopened.count() == 5 and reopened.connected(9, 0)
+        reopened.close()
+        uf.reset()
+        assert uf.count() == 10 and not uf.connected(1, 2)
+        uf.close()
+        with MmapUF.open(path) as uf:
+            assert uf.count() == 10 and uf.find(4) == 4
+
+        # truncated and foreign files are rejected
+        with open(path, "r+b") as f:
+            f.truncate(40)
+        for data in (None, b"", b"not a union-find file at all" * 2):
+            if data is not None:
+                with open(path, "wb") as f:
+                    f.write(data)
+            try:
+                MmapUF.open(path)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("ValueError expected for %r" % data)
+
+        # binary pairs in batches; trailing odd integer and partial item
+        # are ignored
+        pairs_path = os.path.join(directory, "pairs.bin")
+        with open(pairs_path, "wb") as f:
+            f.write(array("i", [0, 1, 2, 3, 1, 3, 7]).tobytes() + b"\x01")
+        batches = [batch.tolist() for batch in read_pairs(pairs_path,
+                                                          batch_pairs=2)]
+        assert batches == [[0, 1, 2, 3], [1, 3]]
+        assert [batch.tolist() for batch in read_pairs(pairs_path)] == [
+            [0, 1, 2, 3, 1, 3]
+        ]
+        with MmapUF(8) as uf:
+            assert uf.union_stream(read_pairs(pairs_path, batch_pairs=1)) == 3
+            assert uf.count() == 5 and uf.connected(0, 2)
+        open(pairs_path, "wb").close()
+        assert list(read_pairs(pairs_path)) == []
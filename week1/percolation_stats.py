@@ -1,59 +1,519 @@
 # coding=utf8
-import math
+import argparse
+import collections
+import cProfile
+import itertools
+import os
 import random
-import sys
-import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-from percolation import Percolation
+from instrumentation import Probe, merge_profiles
+from online_stats import OnlineStats, wilson_interval
+from percolation import DEFAULT_UF, UF_BACKENDS, Percolation
+from result_store import ResultStore
+from site_stream import SiteStream
+
+# trials sent to a worker at once when experiments may stop early
+_TOLERANCE_BATCH = 8
+
+
+def _percolation(n, uf, probe=None, reusable=None):
+    """ Return Percolation with all sites blocked, instrumented when probe is
+        given. Otherwise, with reusable dict (owned by the caller running a
+        series of trials), the model of previous trial of the same size and
+        backend kept there is reset and reused instead of allocating a new
+        one.
+    """
+    if probe is not None:
+        return probe.attach_percolation(Percolation(n, uf=uf))
+    if reusable is None:
+        return Percolation(n, uf=uf)
+    p = reusable.get((n, uf))
+    if p is None:
+        # keep only one model, so a series over sizes does not pile them up
+        reusable.clear()
+        p = reusable[n, uf] = Percolation(n, uf=uf)
+    else:
+        p.reset()
+    return p
+
+
+def _simulate_random(p, n, rng):
+    """ Process independent percolation experiment on blocked n-by-n
+        Percolation p by opening random sites (drawn with replacement) until
+        system percolates. Return threshold and number of wasted draws which
+        hit already open sites.
+    """
+    wasted = 0
+    while True:
+        row, col = rng.randint(0, n - 1), rng.randint(0, n - 1)
+        if p.is_open(row, col):
+            wasted += 1
+            continue
+        p.open(row, col)
+        if p.is_percolates():
+            return p.number_of_open_sites() / (n * n), wasted
+
+
+def _simulate_permutation(p, n, rng):
+    """ Process independent percolation experiment on blocked n-by-n
+        Percolation p by opening sites drawn without replacement (SiteStream)
+        until system percolates.
+
+        Every site is opened at most once, so threshold has the same
+        distribution as in _simulate_random without the wasted draws, and
+        only the sites actually opened are shuffled.
+    """
+    for opened, site in enumerate(SiteStream(n * n, rng), 1):
+        p.open(site // n, site % n)
+        if p.is_percolates():
+            return opened / (n * n), 0
+
+
+def _simulate_curve(p, n, rng, points):
+    """ Open all sites of blocked n-by-n Percolation p in random order,
+        recording fractions of sites in the spanning and in the largest
+        cluster after opening 1/points, 2/points, ..., all sites. Return
+        percolation threshold and list of recorded (spanning, largest) pairs.
+    """
+    sites = n * n
+    # number of open sites at every point (rounded up)
+    marks = [-(-i * sites // points) for i in range(1, points + 1)]
+    threshold, curve = None, []
+    for opened, site in enumerate(SiteStream(sites, rng), 1):
+        p.open(site // n, site % n)
+        if threshold is None and p.is_percolates():
+            threshold = opened / sites
+        while len(curve) < points and marks[len(curve)] == opened:
+            curve.append((p.spanning_cluster_size() / sites,
+                          p.largest_cluster_size() / sites))
+    return threshold, curve
+
+
+def _simulate_fixed(perc, n, p, rng):
+    """ Open every site of blocked n-by-n Percolation perc independently
+        with probability p. Return whether system percolates and fractions
+        of sites in the spanning and in the largest cluster.
+    """
+    rand = rng.random
+    for site in range(n * n):
+        if rand() < p:
+            perc.open(site // n, site % n)
+    sites = n * n
+    return (perc.is_percolates(), perc.spanning_cluster_size() / sites,
+            perc.largest_cluster_size() / sites)
+
+
+ENGINES = {
+    "random": _simulate_random,
+    "permutation": _simulate_permutation,
+}
+
+
+def _trial_rng(seed, trial):
+    """ Return independent random generator for given trial of experiment
+        with master seed (the same for any number of workers)
+    """
+    return random.Random("%d/%d" % (seed, trial))
+
+
+def _run_trial(task, reusable=None):
+    """ Run single trial described by (n, engine, uf, seed, trial,
+        curve_points, profile) tuple and return (threshold, wasted_draws,
+        curve, wall_time, profile) tuple. Percolation kept in reusable dict
+        is reused (see _percolation).
+
+        With profile the trial runs instrumented and under cProfile, and
+        profile in result is (probe stats, raw cProfile stats) pair.
+    """
+    n, engine, uf, seed, trial, curve_points, profile = task
+    rng = _trial_rng(seed, trial)
+    probe = profiler = None
+    if profile:
+        probe, profiler = Probe(), cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    p = _percolation(n, uf, probe, reusable)
+    if curve_points:
+        threshold, curve = _simulate_curve(p, n, rng, curve_points)
+        wasted = 0
+    else:
+        threshold, wasted = ENGINES[engine](p, n, rng)
+        curve = None
+    wall_time = time.perf_counter() - start
+
+    if profiler is None:
+        return threshold, wasted, curve, wall_time, None
+    profiler.disable()
+    profiler.create_stats()
+    return threshold, wasted, curve, wall_time, (probe.stats(),
+                                                 profiler.stats)
+
+
+def _run_trials(tasks):
+    """ Run a batch of tasks in one call, so that a worker process gets and
+        returns them all at once; trials of the batch share one Percolation
+    """
+    reusable = {}
+    return [_run_trial(task, reusable) for task in tasks]
+
+
+def _imap_trials(tasks, workers, batch=1):
+    """ Yield results of tasks in order, running them in a process pool when
+        workers is not 1. Tasks are sent to workers in batches of given size
+        and only a few batches per worker are submitted ahead, so consumer
+        may stop early without waiting for all tasks.
+    """
+    if workers == 1:
+        reusable = {}
+        for task in tasks:
+            yield _run_trial(task, reusable)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    tasks = iter(tasks)
+    batches = iter(lambda: list(itertools.islice(tasks, batch)), [])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque(
+            executor.submit(_run_trials, tasks_batch)
+            for tasks_batch in itertools.islice(batches, 2 * workers)
+        )
+        try:
+            while pending:
+                results = pending.popleft().result()
+                for tasks_batch in itertools.islice(batches, 1):
+                    pending.append(executor.submit(_run_trials, tasks_batch))
+                for result in results:
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _stored_trials(tasks, workers, store, key, batch=1):
+    """ Yield results of tasks in order like _imap_trials, taking results of
+        trials found in store from there and adding newly computed ones
+    """
+    tasks = list(tasks)
+    stored = store.results(key)
+    computed = _imap_trials(
+        (task for task in tasks if task[4] not in stored), workers, batch
+    )
+    try:
+        for task in tasks:
+            trial = task[4]
+            if trial in stored:
+                yield stored[trial] + (None,)
+                continue
+            result = next(computed)
+            store.add(key, trial, result[:4])
+            yield result
+    finally:
+        computed.close()
 
 
 class PercolationStats(object):
     """ Estimation of percolation threshold using Monte Carlo simulation """
 
-    def __init__(self, n, trials):
-        """ Perform trials independent experiments on an n-by-n grid """
-        self._thresholds = []
-        for _ in range(trials):
-            self._thresholds.append(self._simulate(n))
+    def __init__(self, n, trials, engine="random", workers=1, seed=None,
+                 tolerance=None, min_trials=30, uf=DEFAULT_UF,
+                 curve_points=None, profile=False, store=None):
+        """ Perform trials independent experiments on an n-by-n grid.
 
-    def _simulate(self, n):
-        """ Process independent percolation experiment """
-        p = Percolation(n)
-        while True:
-            p.open(random.randint(0, n - 1), random.randint(0, n - 1))
-            if p.is_percolates():
-                return p.number_of_open_sites() / (n * n)
+            engine is a name from ENGINES: "random" opens random sites drawn
+            with replacement (skipping draws of already open sites, counted
+            by wasted_draws()), "permutation" opens sites drawn without
+            replacement.
+
+            uf is a name from UF_BACKENDS which every Percolation is built on.
+
+            Trials are spread across processes when workers is greater than
+            1 (None uses all CPUs). Every trial draws from its own generator
+            derived from master seed, so results for given seed do not depend
+            on number of workers.
+
+            When tolerance is given, trials is an upper bound: experiments
+            stop as soon as half-width of 95% confidence interval falls below
+            tolerance (but not before min_trials experiments, so that the
+            deviation estimate itself is reliable).
+
+            With curve_points every trial opens all sites in random order
+            (whatever the engine is) and also records percolation curve:
+            fractions of sites in the spanning and in the largest cluster at
+            curve_points evenly spaced open fractions, see curve().
+
+            Wall time of every trial is always measured. With profile=True
+            trials also run instrumented (see instrumentation.Probe) and
+            under cProfile, which slows them down; see profile() and
+            profile_stats().
+
+            With store (a ResultStore) results of trials already kept there
+            for the same n, engine, uf, seed and curve_points are reused
+            instead of recomputed, and every new result is appended to it as
+            soon as it is ready, so an interrupted run resumes where it
+            stopped and a longer run only computes new trials. Without seed
+            the stored seed with most trials is reused. Store cannot be
+            combined with profile, which describes trials run right now.
+        """
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine %r" % engine)
+        if uf not in UF_BACKENDS:
+            raise ValueError("Unknown union-find backend %r" % uf)
+        self._uf = uf
+        if profile and store is not None:
+            raise ValueError("Profile cannot be combined with result store")
+        if seed is None and store is not None:
+            seeds = store.seeds(n, engine, uf, curve_points)
+            if seeds:
+                seed = max(sorted(seeds), key=seeds.get)
+        if seed is None:
+            seed = random.getrandbits(64)
+        self._seed = seed
+
+        # thresholds are not kept, only running mean and variance
+        self._stats = OnlineStats()
+        self._curve = [(OnlineStats(), OnlineStats())
+                       for _ in range(curve_points or 0)]
+        self._times = OnlineStats()
+        self._max_time = 0.0
+        self._probe = Probe() if profile else None
+        self._profile_stats = None
+        tasks = ((n, engine, uf, seed, trial, curve_points, profile)
+                 for trial in range(trials))
+        # about four batches per worker keep them all busy till the end;
+        # with tolerance batches are kept small, so that little work is
+        # thrown away when experiments stop early
+        batch = max(1, trials // (4 * (workers or os.cpu_count() or 1)))
+        if tolerance is not None:
+            batch = min(batch, _TOLERANCE_BATCH)
+        if store is None:
+            results = _imap_trials(tasks, workers, batch)
+        else:
+            results = _stored_trials(tasks, workers, store,
+                                     (n, engine, uf, seed, curve_points),
+                                     batch)
+        self._wasted = 0
+        for threshold, wasted, curve, wall_time, trial_profile in results:
+            self._stats.push(threshold)
+            self._wasted += wasted
+            self._times.push(wall_time)
+            self._max_time = max(self._max_time, wall_time)
+            if trial_profile is not None:
+                self._probe.add(trial_profile[0])
+                self._profile_stats = merge_profiles([trial_profile[1]],
+                                                     self._profile_stats)
+            for (spanning, largest), point in zip(curve or (), self._curve):
+                point[0].push(spanning)
+                point[1].push(largest)
+            if (tolerance is not None and
+                    self._stats.count() >= max(2, min_trials) and
+                    self._stats.half_width() < tolerance):
+                break
+        results.close()
+
+    def uf_backend(self):
+        """ Name of union-find backend used in experiments """
+        return self._uf
+
+    def seed(self):
+        """ Master seed which reproduces these experiments """
+        return self._seed
+
+    def trials(self):
+        """ Number of performed experiments """
+        return self._stats.count()
+
+    def wasted_draws(self):
+        """ Number of random draws of already open sites in all experiments
+            (always 0 unless engine is "random")
+        """
+        return self._wasted
+
+    def profile(self):
+        """ Return dict with total, mean and maximum wall time of a trial
+            (in seconds) and, when profiling was on, counters of the
+            instrumented calls (see instrumentation.Probe.stats)
+        """
+        times = self._times
+        result = {
+            "trials": times.count(),
+            "time_total": times.mean() * times.count(),
+            "time_mean": times.mean(),
+            "time_max": self._max_time,
+        }
+        if self._probe is not None:
+            result.update(self._probe.stats())
+        return result
+
+    def profile_stats(self):
+        """ Return pstats.Stats merged over all trials, or None unless
+            profiling was on
+        """
+        return self._profile_stats
 
     def mean(self):
         """ Sample mean of percolation threshold """
-        return statistics.mean(self._thresholds)
+        return self._stats.mean()
 
     def standart_deviation(self):
         """ Sample standard deviation of percolation threshold """
-        return statistics.stdev(self._thresholds)
+        return self._stats.stdev()
 
     def confidence_low(self):
         """ Return low endpoint of 95% confidence interval """
-        mean, stddev = self.mean(), self.standart_deviation()
-        return mean - (1.96 * stddev) / math.sqrt(len(self._thresholds))
+        return self._stats.mean() - self._stats.half_width()
 
     def confidence_high(self):
         """ Return high endpoint of 95% confidence interval """
-        mean, stddev = self.mean(), self.standart_deviation()
-        return mean + (1.96 * stddev) / math.sqrt(len(self._thresholds))
+        return self._stats.mean() + self._stats.half_width()
+
+    def curve(self):
+        """ Return list of (p, spanning, largest) triples: mean fractions of
+            sites in the spanning and in the largest cluster when fraction p
+            of sites is open (empty unless curve_points was given)
+        """
+        points = len(self._curve)
+        return [((i + 1) / points, spanning.mean(), largest.mean())
+                for i, (spanning, largest) in enumerate(self._curve)]
+
+
+class PercolationProbability(object):
+    """ Estimation of probability that n-by-n grid with every site open with
+        probability p percolates, using Monte Carlo simulation
+    """
+
+    def __init__(self, n, p, trials, seed=None, uf=DEFAULT_UF):
+        """ Perform trials independent experiments on an n-by-n grid, every
+            one drawing from its own generator derived from master seed.
+            Also records sizes of the spanning and the largest cluster.
+        """
+        if not 0 <= p <= 1:
+            raise ValueError("Probability must be in [0, 1], got %r" % p)
+        if uf not in UF_BACKENDS:
+            raise ValueError("Unknown union-find backend %r" % uf)
+        if seed is None:
+            seed = random.getrandbits(64)
+        self._seed = seed
+        self._percolates = OnlineStats()
+        self._spanning = OnlineStats()
+        self._largest = OnlineStats()
+        reusable = {}
+        for trial in range(trials):
+            percolates, spanning, largest = _simulate_fixed(
+                _percolation(n, uf, reusable=reusable), n, p,
+                _trial_rng(seed, trial)
+            )
+            self._percolates.push(1.0 if percolates else 0.0)
+            self._spanning.push(spanning)
+            self._largest.push(largest)
+
+    def seed(self):
+        """ Master seed which reproduces these experiments """
+        return self._seed
+
+    def trials(self):
+        """ Number of performed experiments """
+        return self._percolates.count()
+
+    def probability(self):
+        """ Fraction of experiments in which system percolated """
+        return self._percolates.mean()
+
+    def _interval(self):
+        """ Wilson score interval of probability, see wilson_interval """
+        trials = self.trials()
+        return wilson_interval(round(self.probability() * trials), trials)
+
+    def confidence_low(self):
+        """ Return low endpoint of 95% confidence interval of probability """
+        return self._interval()[0]
+
+    def confidence_high(self):
+        """ Return high endpoint of 95% confidence interval of probability """
+        return self._interval()[1]
+
+    def spanning_cluster(self):
+        """ Mean fraction of sites in the spanning cluster """
+        return self._spanning.mean()
+
+    def largest_cluster(self):
+        """ Mean fraction of sites in the largest cluster """
+        return self._largest.mean()
 
 
 if __name__ == "__main__":
-    try:
-        n = int(sys.argv[1])
-        trials = int(sys.argv[2])
-    except (IndexError, ValueError):
-        print("Usage: python3 percolation_stats.py *n* *trials*")
-        sys.exit()
+    parser = argparse.ArgumentParser(
+        description="Estimate percolation threshold of n-by-n grid"
+    )
+    parser.add_argument("n", type=int, help="size of the grid")
+    parser.add_argument("trials", type=int, help="number of experiments")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="random",
+                        help="how sites to open are drawn (default: random)")
+    parser.add_argument("--uf", choices=sorted(UF_BACKENDS),
+                        default=DEFAULT_UF,
+                        help="union-find backend (default: %s)" % DEFAULT_UF)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes to run trials in "
+                             "(0 for all CPUs, default: 1)")
+    parser.add_argument("--seed", type=int,
+                        help="master seed to reproduce experiments")
+    parser.add_argument("--tolerance", type=float,
+                        help="stop once half-width of 95%% confidence "
+                             "interval is below this value")
+    parser.add_argument("--curve", type=int, metavar="POINTS",
+                        help="also print percolation curve at this many "
+                             "open fractions")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="FILE",
+                        help="instrument and profile trials, print counters "
+                             "and top functions or save cProfile report to "
+                             "FILE (to be read by pstats)")
+    parser.add_argument("--store", metavar="FILE",
+                        help="reuse trial results kept in FILE and append "
+                             "new ones there (resumes interrupted runs)")
+    args = parser.parse_args()
+    if args.profile is not None and args.store:
+        parser.error("--profile cannot be combined with --store")
 
-    ps = PercolationStats(n, trials)
+    store = ResultStore(args.store) if args.store else None
+    try:
+        ps = PercolationStats(args.n, args.trials, engine=args.engine,
+                              workers=args.workers or None, seed=args.seed,
+                              tolerance=args.tolerance, uf=args.uf,
+                              curve_points=args.curve,
+                              profile=args.profile is not None, store=store)
+    finally:
+        if store is not None:
+            store.close()
+    print("uf backend:\t\t\t%s" % ps.uf_backend())
+    if store is not None:
+        print("seed:\t\t\t\t%d" % ps.seed())
+    if args.tolerance is not None:
+        print("trials:\t\t\t\t%d" % ps.trials())
+    if args.engine == "random" and not args.curve:
+        print("wasted draws:\t\t\t%d" % ps.wasted_draws())
     print("mean:\t\t\t\t%f" % ps.mean())
     print("stddev:\t\t\t\t%f" % ps.standart_deviation())
     print("95%% confidence interval:\t[%f, %f]" % (
         ps.confidence_low(), ps.confidence_high()
     ))
+    if args.curve:
+        print("p\tspanning\tlargest")
+        for p, spanning, largest in ps.curve():
+            print("%f\t%f\t%f" % (p, spanning, largest))
+    if args.profile is not None:
+        profile = ps.profile()
+        print("time per trial:\t\t\t%f s (max %f s)" % (
+            profile["time_mean"], profile["time_max"]
+        ))
+        for name, value in sorted(profile["counters"].items()):
+            print("%s:\t%d" % (name, value))
+        if profile["max_path_length"] is not None:
+            print("path length:\tmean %f, max %d" % (
+                profile["mean_path_length"], profile["max_path_length"]
+            ))
+        if args.profile == "-":
+            ps.profile_stats().sort_stats("cumulative").print_stats(15)
+        else:
+            ps.profile_stats().dump_stats(args.profile)
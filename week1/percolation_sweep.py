@@ -0,0 +1,168 @@
+# coding=utf8
+"""
+Parameter sweep over grid sizes for finite-size scaling studies.
+
+For every n the sweep estimates percolation threshold (PercolationStats) and,
+for every open probability given with --p, probability that the grid
+percolates together with mean sizes of the spanning and the largest cluster
+(PercolationProbability). Every such cell is one task for a pool of worker
+processes; cells are scheduled largest grid first, so that the longest tasks
+do not end up running alone at the end. Trials of a cell run one after
+another in the same process, reusing one Percolation (see reset).
+
+Results are written as CSV or JSON lines as soon as every cell finishes, in
+order of completion:
+
+    python3 percolation_sweep.py 16 32 64 128 --trials 100
+    python3 percolation_sweep.py 64 128 --p 0.55 0.59 0.63 --format json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from percolation import DEFAULT_UF, UF_BACKENDS
+from percolation_stats import (
+    ENGINES, PercolationProbability, PercolationStats
+)
+from result_store import ResultStore
+
+FIELDS = ["kind", "n", "p", "trials", "seed", "mean", "stddev",
+          "confidence_low", "confidence_high", "spanning_cluster",
+          "largest_cluster", "seconds"]
+
+
+def cells(sizes, probabilities=()):
+    """ Return list of (n, p) cells of the sweep, largest grid first; p is
+        None for threshold estimation
+    """
+    return [(n, p) for n in sorted(set(sizes), reverse=True)
+            for p in [None] + sorted(set(probabilities))]
+
+
+def cell_seed(seed, n, p):
+    """ Return seed of the cell derived from master seed, so that results do
+        not depend on scheduling
+    """
+    return random.Random("%d/%d/%r" % (seed, n, p)).getrandbits(64)
+
+
+def run_cell(n, p, trials, seed, engine="random", uf=DEFAULT_UF,
+             store=None):
+    """ Run trials of a single cell and return its row (dict with FIELDS).
+
+        Threshold cells (p is None) reuse and extend trials kept in result
+        store file at path store, if given.
+    """
+    start = time.perf_counter()
+    if p is None:
+        result_store = ResultStore(store) if store else None
+        try:
+            stats = PercolationStats(n, trials, engine=engine, seed=seed,
+                                     uf=uf, store=result_store)
+        finally:
+            if result_store is not None:
+                result_store.close()
+        row = {
+            "kind": "threshold", "mean": stats.mean(),
+            "stddev": stats.standart_deviation(),
+            "confidence_low": stats.confidence_low(),
+            "confidence_high": stats.confidence_high(),
+            "spanning_cluster": None, "largest_cluster": None,
+        }
+    else:
+        stats = PercolationProbability(n, p, trials, seed=seed, uf=uf)
+        row = {
+            "kind": "probability", "mean": stats.probability(),
+            "stddev": None,
+            "confidence_low": stats.confidence_low(),
+            "confidence_high": stats.confidence_high(),
+            "spanning_cluster": stats.spanning_cluster(),
+            "largest_cluster": stats.largest_cluster(),
+        }
+    row.update(n=n, p=p, trials=stats.trials(), seed=seed,
+               seconds=time.perf_counter() - start)
+    return row
+
+
+def sweep(sizes, trials, probabilities=(), seed=0, engine="random",
+          uf=DEFAULT_UF, workers=1, store=None):
+    """ Yield rows of all cells of the sweep as they finish, running cells in
+        a process pool when workers is not 1 (None uses all CPUs)
+    """
+    tasks = [(n, p, trials, cell_seed(seed, n, p), engine, uf, store)
+             for n, p in cells(sizes, probabilities)]
+    if workers == 1:
+        for task in tasks:
+            yield run_cell(*task)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # pool takes tasks in order of submission: largest grids first
+        futures = [executor.submit(run_cell, *task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sweep percolation experiments over grid sizes"
+    )
+    parser.add_argument("sizes", type=int, nargs="+",
+                        help="sizes n of n-by-n grids")
+    parser.add_argument("--trials", type=int, default=100,
+                        help="number of experiments per cell (default: 100)")
+    parser.add_argument("--p", type=float, nargs="+", default=[],
+                        metavar="P",
+                        help="also estimate probability to percolate at "
+                             "these open probabilities")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="random",
+                        help="how sites to open are drawn in threshold "
+                             "estimation (default: random)")
+    parser.add_argument("--uf", choices=sorted(UF_BACKENDS),
+                        default=DEFAULT_UF,
+                        help="union-find backend (default: %s)" % DEFAULT_UF)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="number of processes to run cells in "
+                             "(default: 0 for all CPUs)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="master seed (default: 0)")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv",
+                        help="output format (default: csv)")
+    parser.add_argument("--output", help="write results to this file")
+    parser.add_argument("--store",
+                        help="reuse threshold trials kept in this file and "
+                             "append new ones there")
+    args = parser.parse_args()
+    if args.trials < 2:
+        # deviation of threshold needs at least two experiments
+        parser.error("at least 2 trials per cell are required")
+    if any(not 0 <= p <= 1 for p in args.p):
+        parser.error("open probabilities must be in [0, 1]")
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    writer = None
+    if args.format == "csv":
+        writer = csv.DictWriter(output, FIELDS)
+        writer.writeheader()
+    try:
+        for row in sweep(args.sizes, args.trials, args.p, seed=args.seed,
+                         engine=args.engine, uf=args.uf,
+                         workers=args.workers or None, store=args.store):
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                output.write(json.dumps(row, sort_keys=True) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
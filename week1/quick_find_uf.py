@@ -1,5 +1,6 @@
 # coding=utf8
-import sys
+from uf_cli import main
+from uf_pairs import split_pairs, validate_pairs
 
 
 class QuickFindUF(object):
@@ -26,6 +27,13 @@ class QuickFindUF(object):
         self._ids = list(range(n))
         self._count = n
 
+    def reset(self):
+        """ Reinitializes the structure in place, making every site a
+            separate component again.
+        """
+        self._ids[:] = range(len(self._ids))
+        self._count = len(self._ids)
+
     def _validate_index(self, idx):
         """ Validate that p is a valid index """
         n = len(self._ids)
@@ -66,19 +74,60 @@ class QuickFindUF(object):
                 self._ids[i] = q_id
         self._count -= 1
 
+    def connected_many(self, pairs):
+        """ Returns bytearray with 1 for every pair (p, q) of sites which are
+            in the same component and 0 otherwise.
+        """
+        ps, qs = split_pairs(pairs)
+        validate_pairs(ps, qs, len(self._ids))
+        ids = self._ids
+        return bytearray(ids[p] == ids[q] for p, q in zip(ps, qs))
+
+    def union_many(self, pairs):
+        """ Merges components for every pair (p, q) of sites in order.
+
+            Returns bytearray with 1 for every pair which merged two different
+            components. Component identifiers are linked into a temporary
+            forest while the batch is processed and relabeled in one linear
+            pass at the end, so a batch takes linear time in total instead of
+            linear time per merge.
+        """
+        ps, qs = split_pairs(pairs)
+        validate_pairs(ps, qs, len(self._ids))
+        ids = self._ids
+        links = {}
+
+        def root(c):
+            # find the final identifier of c, halving the chain on the way
+            while c in links:
+                c_next = links[c]
+                if c_next in links:
+                    links[c] = links[c_next]
+                c = c_next
+            return c
+
+        merged = bytearray(len(ps))
+        for i, (p, q) in enumerate(zip(ps, qs)):
+            p_id, q_id = root(ids[p]), root(ids[q])
+            if p_id == q_id:
+                continue
+            links[p_id] = q_id
+            merged[i] = 1
+            self._count -= 1
+
+        if links:
+            labels = {}
+            for i, c in enumerate(ids):
+                if c in links:
+                    if c not in labels:
+                        labels[c] = root(c)
+                    ids[i] = labels[c]
+        return merged
+
 
 if __name__ == "__main__":
     # Reads in a sequence of pairs of integers (between 0 and n-1) from
-    # standard input, where each integer represents some site; if the sites
-    # are in different components, merge the two components and print
-    # the pair to standard output.
-    n = int(sys.stdin.readline())
-    uf = QuickFindUF(n)
-    for pair in sys.stdin:
-        p, q = map(int, pair.split())
-        if uf.connected(p, q):
-            continue
-        uf.union(p, q)
-        print(p, q)
-
-    print("%d components" % uf.count())
+    # standard input or file, where each integer represents some site; if the
+    # sites are in different components, merge the two components and print
+    # the pair to standard output (see --help for bulk and quiet modes).
+    main(QuickFindUF)
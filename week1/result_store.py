@@ -0,0 +1,130 @@
+# coding=utf8
+import collections
+import json
+import os
+
+
+class ResultStore(object):
+    """
+    On-disk, append-only store of percolation trial results.
+
+    Results are kept in a text file, one JSON record per trial, keyed by
+    (n, engine, uf, seed, curve_points) and trial number. Trials of
+    PercolationStats are deterministic for given key and trial number, so a
+    stored result is exactly what running the trial again would give.
+
+    Every record is flushed as soon as it is added, so a killed process loses
+    at most the trial it was running. A line truncated by such a kill is
+    skipped when the store is opened again.
+    """
+
+    def __init__(self, path):
+        """ Open store in file path, creating it if necessary """
+        self._path = path
+        self._results = collections.defaultdict(dict)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+
+        for line in data.splitlines():
+            try:
+                record = json.loads(line.decode("utf8"))
+            except ValueError:
+                continue
+            self._load(record)
+
+        self._file = open(path, "a", encoding="utf8")
+        if data and not data.endswith(b"\n"):
+            # do not glue next record to a truncated one
+            self._file.write("\n")
+
+    def _load(self, record):
+        """ Put record read from file to in-memory index """
+        key = (record["n"], record["engine"], record["uf"], record["seed"],
+               record["curve_points"])
+        curve = record["curve"]
+        if curve is not None:
+            curve = [tuple(point) for point in curve]
+        self._results[key][record["trial"]] = (
+            record["threshold"], record["wasted"], curve, record["time"]
+        )
+
+    def path(self):
+        """ Return path of the file of this store """
+        return self._path
+
+    def results(self, key):
+        """ Return dict mapping trial number to (threshold, wasted_draws,
+            curve, wall_time) tuple for all stored trials of key, that is
+            (n, engine, uf, seed, curve_points) tuple
+        """
+        return dict(self._results.get(tuple(key), {}))
+
+    def seeds(self, n, engine, uf, curve_points=None):
+        """ Return dict mapping every stored seed of given experiment to its
+            number of stored trials
+        """
+        return {key[3]: len(trials)
+                for key, trials in self._results.items()
+                if key[:3] == (n, engine, uf) and key[4] == curve_points}
+
+    def add(self, key, trial, result):
+        """ Append result (threshold, wasted_draws, curve, wall_time) of
+            given trial of key and flush it to disk
+        """
+        n, engine, uf, seed, curve_points = key
+        threshold, wasted, curve, wall_time = result
+        record = {
+            "n": n, "engine": engine, "uf": uf, "seed": seed,
+            "curve_points": curve_points, "trial": trial,
+            "threshold": threshold, "wasted": wasted, "curve": curve,
+            "time": wall_time,
+        }
+        self._file.write(json.dumps(record, sort_keys=True) + "\n")
+        self._file.flush()
+        self._load(record)
+
+    def close(self):
+        """ Flush all records to disk and close the store """
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.jsonl")
+        key = (10, "random", "weighted", 1, None)
+        with ResultStore(path) as store:
+            store.add(key, 0, (0.5, 3, None, 0.01))
+            store.add(key, 1, (0.625, 0, None, 0.02))
+            store.add((10, "random", "weighted", 2, 2), 0,
+                      (0.25, 0, [(0.0, 0.1), (1.0, 1.0)], 0.01))
+
+        # simulate a write cut short by a killed process
+        with open(path, "a") as f:
+            f.write('{"n": 10, "engine"')
+
+        with ResultStore(path) as store:
+            assert store.results(key) == {0: (0.5, 3, None, 0.01),
+                                          1: (0.625, 0, None, 0.02)}
+            assert store.seeds(10, "random", "weighted") == {1: 2}
+            assert store.seeds(10, "random", "weighted", 2) == {2: 1}
+            assert store.results((10, "random", "weighted", 2, 2))[0][2] == [
+                (0.0, 0.1), (1.0, 1.0)
+            ]
+            store.add(key, 2, (0.75, 1, None, 0.03))
+
+        with ResultStore(path) as store:
+            assert sorted(store.results(key)) == [0, 1, 2]
@@ -0,0 +1,54 @@
+# coding=utf8
+import random
+from array import array
+
+
+class SiteStream(object):
+    """
+    Iterator over sites 0 through n-1 in uniformly random order, each site
+    exactly once (sampling without replacement).
+
+    This implementation runs Fisher–Yates shuffle lazily: every next() swaps
+    one random site into place, so drawing k sites takes time proportional
+    to k rather than n. Sites are kept in a typed array (4 bytes per site
+    while n fits into signed 32-bit integer).
+    """
+
+    def __init__(self, n, rng=random):
+        """ Create stream over n sites drawing from rng (random.Random or
+            random module)
+        """
+        self._sites = array("i" if n < 2 ** 31 else "q", range(n))
+        self._random = rng.random
+        self._drawn = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """ Return next random site not drawn before """
+        sites, i = self._sites, self._drawn
+        n = len(sites)
+        if i == n:
+            raise StopIteration
+        j = i + int(self._random() * (n - i))
+        sites[i], sites[j] = sites[j], sites[i]
+        self._drawn = i + 1
+        return sites[i]
+
+    def drawn(self):
+        """ Return number of sites drawn so far """
+        return self._drawn
+
+    def remaining(self):
+        """ Return number of sites not drawn yet """
+        return len(self._sites) - self._drawn
+
+
+if __name__ == "__main__":
+    stream = SiteStream(10, random.Random(1))
+    first = [next(stream) for _ in range(4)]
+    assert stream.drawn() == 4 and stream.remaining() == 6
+    assert sorted(first + list(stream)) == list(range(10))
+    assert stream.remaining() == 0
+    assert list(SiteStream(0)) == []
@@ -0,0 +1,110 @@
+# coding=utf8
+""" Command line driver shared by union-find implementations """
+import argparse
+import mmap
+import sys
+from array import array
+
+# bytes of input parsed and merged at once in bulk mode
+CHUNK_SIZE = 1 << 24
+
+
+def _read_chunks(stream, size):
+    """ Yield chunks of about size bytes from stream, cut after the last
+        newline so that no pair is split between two chunks
+    """
+    tail = b""
+    while True:
+        data = stream.read(size)
+        if not data:
+            break
+        data = tail + data
+        cut = data.rfind(b"\n") + 1
+        if cut == 0:
+            tail = data
+            continue
+        tail = data[cut:]
+        yield data[:cut]
+    if tail.strip():
+        yield tail
+
+
+def _run_lines(uf, stream, out, quiet):
+    """ Merge pairs one line at a time """
+    for pair in stream:
+        p, q = map(int, pair.split())
+        if uf.connected(p, q):
+            continue
+        uf.union(p, q)
+        if not quiet:
+            out.write("%d %d\n" % (p, q))
+
+
+def _run_bulk(uf, stream, out, quiet, chunk_size):
+    """ Parse and merge pairs a chunk at a time using union_many """
+    for chunk in _read_chunks(stream, chunk_size):
+        flat = array("q", map(int, chunk.split()))
+        merged = uf.union_many(flat)
+        if not quiet:
+            out.write("".join(
+                "%d %d\n" % (flat[2 * i], flat[2 * i + 1])
+                for i, is_merged in enumerate(merged) if is_merged
+            ))
+
+
+def main(uf_class, argv=None, backing_file=False):
+    """ Reads in a sequence of pairs of integers (between 0 and n-1) where
+        each integer represents some site; if the sites are in different
+        components, merge the two components and print the pair to standard
+        output. Input starts with n and comes from file or standard input.
+
+        With backing_file the client also accepts --file, a path passed to
+        uf_class(n, path) to keep the structure in (see MmapUF).
+    """
+    parser = argparse.ArgumentParser(
+        description="Dynamic connectivity client for %s" % uf_class.__name__
+    )
+    parser.add_argument("path", nargs="?",
+                        help="input file, memory-mapped (default: stdin)")
+    parser.add_argument("--bulk", action="store_true",
+                        help="parse and merge input in large chunks")
+    parser.add_argument("--quiet", action="store_true",
+                        help="print only the number of components")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="bytes per chunk in bulk mode")
+    if backing_file:
+        parser.add_argument("--file", metavar="FILE",
+                            help="keep the structure in FILE (truncated if "
+                                 "it exists) instead of memory, so that it "
+                                 "is not limited by RAM and is kept after "
+                                 "the run")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("chunk size must be positive, got %d" % args.chunk_size)
+
+    out = sys.stdout
+    if args.path is None:
+        stream = sys.stdin.buffer
+        f = None
+    else:
+        f = open(args.path, "rb")
+        stream = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        n = int(stream.readline())
+        if getattr(args, "file", None) is not None:
+            uf = uf_class(n, args.file)
+        else:
+            uf = uf_class(n)
+        if args.bulk:
+            _run_bulk(uf, stream, out, args.quiet, args.chunk_size)
+        else:
+            _run_lines(uf, iter(stream.readline, b""), out, args.quiet)
+    finally:
+        if f is not None:
+            stream.close()
+            f.close()
+
+    out.write("%d components\n" % uf.count())
+    if hasattr(uf, "close"):
+        uf.close()
@@ -0,0 +1,60 @@
+# coding=utf8
+""" Helpers for batched union–find operations over pairs of sites """
+
+
+def split_pairs(pairs):
+    """ Split a batch of pairs into two lists of sites (ps, qs).
+
+        Accepts a flat buffer of even length (array, memoryview, 1-d NumPy
+        array: p0, q0, p1, q1, ...), a 2-d buffer of shape (k, 2) or any
+        iterable of (p, q) pairs.
+    """
+    try:
+        view = memoryview(pairs)
+    except TypeError:
+        view = None
+
+    if view is not None and view.ndim == 1:
+        flat = view.tolist()
+        if len(flat) % 2:
+            raise ValueError("Flat buffer of pairs has odd length %d" % len(
+                flat
+            ))
+        return flat[0::2], flat[1::2]
+
+    if view is not None:
+        pairs = view.tolist()
+
+    ps, qs = [], []
+    for p, q in pairs:
+        ps.append(p)
+        qs.append(q)
+    return ps, qs
+
+
+def validate_pairs(ps, qs, n):
+    """ Validate once for the whole batch that all sites are in [0, n) """
+    if not ps:
+        return
+    low, high = min(min(ps), min(qs)), max(max(ps), max(qs))
+    if low < 0:
+        raise IndexError("Index %d is not between 0 and %d" % (low, n - 1))
+    if high >= n:
+        raise IndexError("Index %d is not between 0 and %d" % (high, n - 1))
+
+
+if __name__ == "__main__":
+    from array import array
+
+    assert split_pairs([(0, 1), (2, 3)]) == ([0, 2], [1, 3])
+    assert split_pairs(array("i", [0, 1, 2, 3])) == ([0, 2], [1, 3])
+    assert split_pairs(memoryview(array("q", [4, 5]))) == ([4], [5])
+    assert split_pairs([]) == ([], [])
+    validate_pairs([0, 2], [1, 3], 4)
+    for bad in ([-1], [0]), ([0], [4]):
+        try:
+            validate_pairs(bad[0], bad[1], 4)
+        except IndexError:
+            pass
+        else:
+            raise AssertionError("IndexError expected for %r" % (bad,))
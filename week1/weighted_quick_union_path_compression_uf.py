@@ -0,0 +1,137 @@
+# coding=utf8
+from array import array
+
+from uf_cli import main
+from uf_pairs import split_pairs, validate_pairs
+
+
+class WeightedQuickUnionPathCompressionUF(object):
+    """
+    The WeightedQuickUnionPathCompressionUF class represents a union–find
+    data type (also known as the disjoint-sets data type). It supports the
+    union and find operations, along with a connected operation for
+    determining whether two sites are in the same component and a count
+    operation that returns the total number of components. The union–find
+    data type models connectivity among a set of n sites, named 0 through
+    n–1.
+
+    This implementation uses weighted quick union by size with path halving
+    (every other node on the path to the root is made to point to its
+    grandparent). Initializing a data structure with n sites takes linear
+    time. Afterwards, the union, find, and connected operations take
+    logarithmic time (in the worst case) and very nearly, but not quite,
+    constant time in amortized sense; the count operation takes constant time.
+
+    Parent links and component sizes are kept in typed arrays (4 bytes per
+    site while n fits into signed 32-bit integer) instead of lists of Python
+    ints.
+
+    All credits goes to Robert Sedgewick and Kevin Wayne.
+    """
+
+    def __init__(self, n):
+        """ Initializes an empty union–find data structure with n sites 0
+            through n-1.
+        """
+        typecode = "i" if n < 2 ** 31 else "q"
+        self._count = n
+        self._parent = array(typecode, range(n))
+        self._size = array(typecode, [1]) * n
+
+    def reset(self):
+        """ Reinitializes the structure in place, making every site a
+            separate component again.
+        """
+        n, typecode = len(self._parent), self._parent.typecode
+        self._count = n
+        self._parent[:] = array(typecode, range(n))
+        # fill sizes with ones byte-wise, without building array of ones
+        memoryview(self._size).cast("B")[:] = (
+            array(typecode, [1]).tobytes() * n
+        )
+
+    def _validate_index(self, idx):
+        """ Validate that p is a valid index """
+        n = len(self._parent)
+        if idx < 0 or idx >= n:
+            raise IndexError("Index %d is not between 0 and %d" % (idx, n - 1))
+
+    def _root(self, p):
+        """ Returns the root of site p, halving the path on the way up """
+        parent = self._parent
+        while p != parent[p]:
+            parent[p] = parent[parent[p]]
+            p = parent[p]
+        return p
+
+    def connected(self, p, q):
+        """ Returns True if the sites p and q are in the same component. """
+        return self.find(p) == self.find(q)
+
+    def count(self):
+        """ Returns the number of components """
+        return self._count
+
+    def find(self, p):
+        """ Returns the component identifier for the component containing
+            site p.
+        """
+        self._validate_index(p)
+        return self._root(p)
+
+    def union(self, p, q):
+        """ Merges the component containing site p with the the component
+            containing site q.
+        """
+        rootP = self.find(p)
+        rootQ = self.find(q)
+        if rootP == rootQ:
+            return
+
+        # make smaller root point to larger one
+        if self._size[rootP] < self._size[rootQ]:
+            self._parent[rootP] = rootQ
+            self._size[rootQ] += self._size[rootP]
+        else:
+            self._parent[rootQ] = rootP
+            self._size[rootP] += self._size[rootQ]
+        self._count -= 1
+
+    def connected_many(self, pairs):
+        """ Returns bytearray with 1 for every pair (p, q) of sites which are
+            in the same component and 0 otherwise.
+        """
+        ps, qs = split_pairs(pairs)
+        validate_pairs(ps, qs, len(self._parent))
+        root = self._root
+        return bytearray(root(p) == root(q) for p, q in zip(ps, qs))
+
+    def union_many(self, pairs):
+        """ Merges components for every pair (p, q) of sites in order.
+
+            Returns bytearray with 1 for every pair which merged two different
+            components. Sites are validated once for the whole batch.
+        """
+        ps, qs = split_pairs(pairs)
+        validate_pairs(ps, qs, len(self._parent))
+        root, parent, size = self._root, self._parent, self._size
+        merged = bytearray(len(ps))
+        for i, (p, q) in enumerate(zip(ps, qs)):
+            rootP, rootQ = root(p), root(q)
+            if rootP == rootQ:
+                continue
+            if size[rootP] < size[rootQ]:
+                rootP, rootQ = rootQ, rootP
+            parent[rootQ] = rootP
+            size[rootP] += size[rootQ]
+            merged[i] = 1
+        self._count -= sum(merged)
+        return merged
+
+
+if __name__ == "__main__":
+    # Reads in a sequence of pairs of integers (between 0 and n-1) from
+    # standard input or file, where each integer represents some site; if the
+    # sites are in different components, merge the two components and print
+    # the pair to standard output (see --help for bulk and quiet modes).
+    main(WeightedQuickUnionPathCompressionUF)
@@ -1,5 +1,6 @@
 # coding=utf8
-import sys
+from uf_cli import main
+from uf_pairs import split_pairs, validate_pairs
 
 
 class WeightedQuickUnionUF(object):
@@ -28,12 +29,28 @@ class WeightedQuickUnionUF(object):
         self._parent = list(range(n))
         self._size = [1] * n
 
+    def reset(self):
+        """ Reinitializes the structure in place, making every site a
+            separate component again.
+        """
+        n = len(self._parent)
+        self._count = n
+        self._parent[:] = range(n)
+        self._size[:] = [1] * n
+
     def _validate_index(self, idx):
         """ Validate that p is a valid index """
         n = len(self._parent)
         if idx < 0 or idx >= n:
             raise IndexError("Index %d is not between 0 and %d" % (idx, n - 1))
 
+    def _root(self, p):
+        """ Returns the root of site p without validating it """
+        parent = self._parent
+        while p != parent[p]:
+            p = parent[p]
+        return p
+
     def connected(self, p, q):
         """ Returns True if the sites p and q are in the same component. """
         return self.find(p) == self.find(q)
@@ -47,9 +64,7 @@ class WeightedQuickUnionUF(object):
             site p.
         """
         self._validate_index(p)
-        while p != self._parent[p]:
-            p = self._parent[p]
-        return p
+        return self._root(p)
 
     def union(self, p, q):
         """ Merges the component containing site p with the the component
@@ -69,19 +84,41 @@ class WeightedQuickUnionUF(object):
             self._size[rootP] += self._size[rootQ]
         self._count -= 1
 
+    def connected_many(self, pairs):
+        """ Returns bytearray with 1 for every pair (p, q) of sites which are
+            in the same component and 0 otherwise.
+        """
+        ps, qs = split_pairs(pairs)
+        validate_pairs(ps, qs, len(self._parent))
+        root = self._root
+        return bytearray(root(p) == root(q) for p, q in zip(ps, qs))
+
+    def union_many(self, pairs):
+        """ Merges components for every pair (p, q) of sites in order.
+
+            Returns bytearray with 1 for every pair which merged two different
+            components. Sites are validated once for the whole batch.
+        """
+        ps, qs = split_pairs(pairs)
+        validate_pairs(ps, qs, len(self._parent))
+        root, parent, size = self._root, self._parent, self._size
+        merged = bytearray(len(ps))
+        for i, (p, q) in enumerate(zip(ps, qs)):
+            rootP, rootQ = root(p), root(q)
+            if rootP == rootQ:
+                continue
+            if size[rootP] < size[rootQ]:
+                rootP, rootQ = rootQ, rootP
+            parent[rootQ] = rootP
+            size[rootP] += size[rootQ]
+            merged[i] = 1
+        self._count -= sum(merged)
+        return merged
+
 
 if __name__ == "__main__":
     # Reads in a sequence of pairs of integers (between 0 and n-1) from
-    # standard input, where each integer represents some site; if the sites
-    # are in different components, merge the two components and print
-    # the pair to standard output.
-    n = int(sys.stdin.readline())
-    uf = WeightedQuickUnionUF(n)
-    for pair in sys.stdin:
-        p, q = map(int, pair.split())
-        if uf.connected(p, q):
-            continue
-        uf.union(p, q)
-        print(p, q)
-
-    print("%d components" % uf.count())
+    # standard input or file, where each integer represents some site; if the
+    # sites are in different components, merge the two components and print
+    # the pair to standard output (see --help for bulk and quiet modes).
+    main(WeightedQuickUnionUF)
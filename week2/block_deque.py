@@ -0,0 +1,309 @@
+# coding=utf8
+
+# number of item slots in every block
+BLOCK_SIZE = 64
+
+
+class DequeBlock(object):
+    __slots__ = ("items", "next_block", "prev_block")
+
+    def __init__(self):
+        self.items = [None] * BLOCK_SIZE
+        self.next_block = None
+        self.prev_block = None
+
+    def __repr__(self):
+        return "<DequeBlock %r>" % self.items
+
+
+class BlockDeque(object):
+    """
+    A double-ended queue or deque (pronounced "deck") is a generalization of
+    a stack and a queue that supports adding and removing items from either
+    the front or the back of the data structure.
+
+    This implementation keeps items in a doubly-linked list of fixed-size
+    blocks (the same layout as CPython's collections.deque), so a new node is
+    allocated only once per BLOCK_SIZE items and every item costs one slot
+    of a list instead of a whole node object.
+    Each deque operation takes constant worst-case time. A deque containing
+    n items use space proportional to the number of items currently in the
+    deque (at most two blocks are partially filled).
+    Iterator implementation support each operation (including construction)
+    in constant worst-case time.
+    """
+
+    __slots__ = ("_first", "_last", "_first_idx", "_last_idx", "_count",
+                 "_spare")
+
+    def __init__(self):
+        """ Construct an empty deque """
+        block = DequeBlock()
+        self._first = self._last = block
+        # _first_idx is the slot of the first item in the first block and
+        # _last_idx is the slot of the last item in the last block
+        self._recenter()
+        self._count = 0
+        # one emptied block is kept to avoid reallocation on the boundary
+        self._spare = None
+
+    def _new_block(self):
+        """ Return spare block if there is one or allocate a new one """
+        block = self._spare
+        if block is None:
+            return DequeBlock()
+        self._spare = None
+        return block
+
+    def _free_block(self, block):
+        """ Keep emptied block as spare one """
+        block.next_block = block.prev_block = None
+        self._spare = block
+
+    def _recenter(self):
+        """ Make room for both ends in the only block of empty deque """
+        self._first_idx = BLOCK_SIZE // 2
+        self._last_idx = self._first_idx - 1
+
+    def is_empty(self):
+        """ Return True if the deque is empty """
+        return self._count == 0
+
+    def __len__(self):
+        """ Return the number of items on the deque """
+        return self._count
+
+    def _grow_first(self):
+        """ Link a new block before the first one """
+        block = self._new_block()
+        block.next_block = self._first
+        self._first.prev_block = block
+        self._first = block
+        self._first_idx = BLOCK_SIZE
+
+    def _grow_last(self):
+        """ Link a new block after the last one """
+        block = self._new_block()
+        block.prev_block = self._last
+        self._last.next_block = block
+        self._last = block
+        self._last_idx = -1
+
+    def add_first(self, item):
+        """ Add the item to the front """
+        if self._first_idx == 0:
+            self._grow_first()
+        self._first_idx -= 1
+        self._first.items[self._first_idx] = item
+        self._count += 1
+
+    def add_last(self, item):
+        """ Add the item to the end """
+        if self._last_idx == BLOCK_SIZE - 1:
+            self._grow_last()
+        self._last_idx += 1
+        self._last.items[self._last_idx] = item
+        self._count += 1
+
+    def extend_first(self, items):
+        """ Add every item to the front in turn (so they end up in reverse
+            order), copying whole slices into blocks
+        """
+        items = list(items)
+        pos = 0
+        while pos < len(items):
+            if self._first_idx == 0:
+                self._grow_first()
+            take = min(self._first_idx, len(items) - pos)
+            chunk = items[pos:pos + take]
+            chunk.reverse()
+            self._first.items[self._first_idx - take:self._first_idx] = chunk
+            self._first_idx -= take
+            pos += take
+        self._count += len(items)
+
+    def extend_last(self, items):
+        """ Add every item to the end in turn, copying whole slices into
+            blocks
+        """
+        items = list(items)
+        pos = 0
+        while pos < len(items):
+            if self._last_idx == BLOCK_SIZE - 1:
+                self._grow_last()
+            start = self._last_idx + 1
+            take = min(BLOCK_SIZE - start, len(items) - pos)
+            self._last.items[start:start + take] = items[pos:pos + take]
+            self._last_idx += take
+            pos += take
+        self._count += len(items)
+
+    def remove_first(self):
+        """ Remove and return the item from the front """
+        if self._count == 0:
+            raise KeyError("Remove from empty deque")
+
+        items = self._first.items
+        item = items[self._first_idx]
+        items[self._first_idx] = None
+        self._first_idx += 1
+        self._count -= 1
+
+        if self._count == 0:
+            self._recenter()
+        elif self._first_idx == BLOCK_SIZE:
+            block = self._first
+            self._first = block.next_block
+            self._first.prev_block = None
+            self._first_idx = 0
+            self._free_block(block)
+
+        return item
+
+    def remove_last(self):
+        """ Remove and return the item from the end """
+        if self._count == 0:
+            raise KeyError("Remove from empty deque")
+
+        items = self._last.items
+        item = items[self._last_idx]
+        items[self._last_idx] = None
+        self._last_idx -= 1
+        self._count -= 1
+
+        if self._count == 0:
+            self._recenter()
+        elif self._last_idx == -1:
+            block = self._last
+            self._last = block.prev_block
+            self._last.next_block = None
+            self._last_idx = BLOCK_SIZE - 1
+            self._free_block(block)
+
+        return item
+
+    def _check_remove_many(self, k):
+        """ Validate that k items can be removed """
+        if k < 0 or k > self._count:
+            raise KeyError("Remove %d items from deque of size %d" % (
+                k, self._count
+            ))
+
+    def remove_first_many(self, k):
+        """ Remove and return list of k items from the front, in order from
+            the front, copying whole slices out of blocks
+        """
+        self._check_remove_many(k)
+        result = []
+        while k > 0:
+            block = self._first
+            end = self._last_idx + 1 if block is self._last else BLOCK_SIZE
+            take = min(k, end - self._first_idx)
+            stop = self._first_idx + take
+            result += block.items[self._first_idx:stop]
+            block.items[self._first_idx:stop] = [None] * take
+            self._first_idx = stop
+            self._count -= take
+            k -= take
+
+            if self._count == 0:
+                self._recenter()
+            elif self._first_idx == BLOCK_SIZE:
+                self._first = block.next_block
+                self._first.prev_block = None
+                self._first_idx = 0
+                self._free_block(block)
+        return result
+
+    def remove_last_many(self, k):
+        """ Remove and return list of k items from the end, in order from
+            the end, copying whole slices out of blocks
+        """
+        self._check_remove_many(k)
+        result = []
+        while k > 0:
+            block = self._last
+            start = self._first_idx if block is self._first else 0
+            take = min(k, self._last_idx + 1 - start)
+            low, stop = self._last_idx + 1 - take, self._last_idx + 1
+            chunk = block.items[low:stop]
+            chunk.reverse()
+            result += chunk
+            block.items[low:stop] = [None] * take
+            self._last_idx = low - 1
+            self._count -= take
+            k -= take
+
+            if self._count == 0:
+                self._recenter()
+            elif self._last_idx == -1:
+                self._last = block.prev_block
+                self._last.next_block = None
+                self._last_idx = BLOCK_SIZE - 1
+                self._free_block(block)
+        return result
+
+    def __iter__(self):
+        block, idx = self._first, self._first_idx
+        for _ in range(self._count):
+            if idx == BLOCK_SIZE:
+                block, idx = block.next_block, 0
+            yield block.items[idx]
+            idx += 1
+
+
+if __name__ == "__main__":
+    # simple tests
+    d = BlockDeque()
+    assert d.is_empty()
+    assert len(d) == 0
+    assert tuple(d) == tuple()
+    d.add_first(1)
+    assert not d.is_empty()
+    d.add_first(0)
+    assert len(d) == 2
+    d.add_last(2)
+    assert tuple(d) == (0, 1, 2)
+    d.remove_first()
+    assert len(d) == 2
+    d.add_last("%")
+    assert tuple(d) == (1, 2, "%")
+    d.remove_last()
+    assert len(d) == 2
+    d.remove_last()
+    assert not d.is_empty()
+    d.remove_last()
+    assert d.is_empty()
+    d.add_first(-1)
+    assert tuple(d) == (-1,)
+    d.remove_first()
+    assert len(d) == 0
+    d.add_last("")
+    assert not d.is_empty()
+
+    # crossing block boundaries from both ends
+    d = BlockDeque()
+    for i in range(5 * BLOCK_SIZE):
+        d.add_last(i)
+        d.add_first(-i - 1)
+    assert tuple(d) == tuple(range(-5 * BLOCK_SIZE, 5 * BLOCK_SIZE))
+    for i in range(5 * BLOCK_SIZE):
+        assert d.remove_first() == -5 * BLOCK_SIZE + i
+    for i in range(5 * BLOCK_SIZE):
+        assert d.remove_last() == 5 * BLOCK_SIZE - 1 - i
+    assert d.is_empty()
+
+    # bulk operations
+    d = BlockDeque()
+    d.extend_last(range(3 * BLOCK_SIZE))
+    d.extend_first(range(-1, -2 * BLOCK_SIZE - 1, -1))
+    assert tuple(d) == tuple(range(-2 * BLOCK_SIZE, 3 * BLOCK_SIZE))
+    assert d.remove_first_many(BLOCK_SIZE + 1) == list(
+        range(-2 * BLOCK_SIZE, -BLOCK_SIZE + 1)
+    )
+    assert d.remove_last_many(2 * BLOCK_SIZE) == list(
+        range(3 * BLOCK_SIZE - 1, BLOCK_SIZE - 1, -1)
+    )
+    assert len(d) == 2 * BLOCK_SIZE - 1
+    d.remove_first_many(len(d))
+    assert d.is_empty()
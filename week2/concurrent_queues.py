@@ -0,0 +1,388 @@
+# coding=utf8
+"""
+Thread-safe and asyncio counterparts of the queues from this week.
+
+Blocking variants wait in get (and in put, when capacity is bounded) instead
+of raising KeyError, and raise queue.Empty / queue.Full when the timeout
+expires. Async variants provide the same operations as coroutines.
+"""
+import asyncio
+import queue
+import threading
+
+from block_deque import BlockDeque
+from randomized_queue import RandomizedQueue
+from resizing_array_queue import ResizingArrayQueue
+
+
+class _Node(object):
+    __slots__ = ("item", "next_node")
+
+    def __init__(self, item):
+        self.item = item
+        self.next_node = None
+
+
+class BlockingQueue(object):
+    """
+    Thread-safe FIFO queue with optional bounded capacity.
+
+    This implementation uses linked list with separate locks for head and tail
+    (two-lock queue), so producers and consumers do not contend with each
+    other: put takes only the tail lock and get takes only the head lock; the
+    shared counter is updated under its own short lock.
+    """
+
+    def __init__(self, capacity=None):
+        """ Initializes an empty queue holding at most capacity items
+            (unbounded when capacity is None)
+        """
+        if capacity is not None and capacity < 1:
+            raise ValueError("Capacity must be positive, got %r" % capacity)
+        self._capacity = capacity
+        # head is a dummy node, first item is in head.next_node
+        self._head = self._tail = _Node(None)
+        self._count = 0
+        self._count_lock = threading.Lock()
+        self._put_lock = threading.Lock()
+        self._not_full = threading.Condition(self._put_lock)
+        self._take_lock = threading.Lock()
+        self._not_empty = threading.Condition(self._take_lock)
+
+    def __len__(self):
+        """ Returns the number of items in this queue """
+        return self._count
+
+    def is_empty(self):
+        """ Return True if queue is empty """
+        return self._count == 0
+
+    def _has_room(self):
+        return self._capacity is None or self._count < self._capacity
+
+    def put(self, item, timeout=None):
+        """ Adds the item to this queue, waiting at most timeout seconds for
+            free room (forever when timeout is None)
+        """
+        node = _Node(item)
+        with self._not_full:
+            if not self._not_full.wait_for(self._has_room, timeout):
+                raise queue.Full("Put to full queue")
+            self._tail.next_node = node
+            self._tail = node
+            with self._count_lock:
+                count = self._count
+                self._count += 1
+            # wake up another producer if there is still room
+            if self._has_room():
+                self._not_full.notify()
+
+        if count == 0:
+            with self._not_empty:
+                self._not_empty.notify()
+
+    def get(self, timeout=None):
+        """ Removes and returns least recently added item, waiting at most
+            timeout seconds for one (forever when timeout is None)
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._count > 0, timeout):
+                raise queue.Empty("Get from empty queue")
+            node = self._head.next_node
+            item, node.item = node.item, None
+            self._head = node
+            with self._count_lock:
+                count = self._count
+                self._count -= 1
+            # wake up another consumer if there are still items
+            if count > 1:
+                self._not_empty.notify()
+
+        if self._capacity is not None and count == self._capacity:
+            with self._not_full:
+                self._not_full.notify()
+        return item
+
+
+class _BlockingContainer(object):
+    """ Single-lock blocking wrapper around one of the queues """
+
+    def __init__(self, container, capacity=None):
+        if capacity is not None and capacity < 1:
+            raise ValueError("Capacity must be positive, got %r" % capacity)
+        self._container = container
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def __len__(self):
+        return len(self._container)
+
+    def is_empty(self):
+        return self._container.is_empty()
+
+    def _has_room(self):
+        return (self._capacity is None or
+                len(self._container) < self._capacity)
+
+    def _put(self, add, item, timeout):
+        with self._not_full:
+            if not self._not_full.wait_for(self._has_room, timeout):
+                raise queue.Full("Put to full queue")
+            add(item)
+            self._not_empty.notify()
+
+    def _get(self, remove, timeout):
+        with self._not_empty:
+            if not self._not_empty.wait_for(
+                    lambda: not self._container.is_empty(), timeout):
+                raise queue.Empty("Get from empty queue")
+            item = remove()
+            self._not_full.notify()
+            return item
+
+
+class BlockingRandomizedQueue(_BlockingContainer):
+    """ Thread-safe RandomizedQueue with blocking get and optional bounded
+        capacity
+    """
+
+    def __init__(self, capacity=None):
+        """ Initializes an empty queue holding at most capacity items """
+        super(BlockingRandomizedQueue, self).__init__(RandomizedQueue(),
+                                                      capacity)
+
+    def put(self, item, timeout=None):
+        """ Adds the item, waiting at most timeout seconds for free room """
+        self._put(self._container.enqueue, item, timeout)
+
+    def get(self, timeout=None):
+        """ Removes and returns random item, waiting at most timeout seconds
+            for one
+        """
+        return self._get(self._container.dequeue, timeout)
+
+
+class BlockingDeque(_BlockingContainer):
+    """ Thread-safe deque with blocking removes and optional bounded
+        capacity
+    """
+
+    def __init__(self, capacity=None):
+        """ Initializes an empty deque holding at most capacity items """
+        super(BlockingDeque, self).__init__(BlockDeque(), capacity)
+
+    def put_first(self, item, timeout=None):
+        """ Adds the item to the front, waiting at most timeout seconds for
+            free room
+        """
+        self._put(self._container.add_first, item, timeout)
+
+    def put_last(self, item, timeout=None):
+        """ Adds the item to the end, waiting at most timeout seconds for free
+            room
+        """
+        self._put(self._container.add_last, item, timeout)
+
+    def get_first(self, timeout=None):
+        """ Removes and returns the item from the front, waiting at most
+            timeout seconds for one
+        """
+        return self._get(self._container.remove_first, timeout)
+
+    def get_last(self, timeout=None):
+        """ Removes and returns the item from the end, waiting at most timeout
+            seconds for one
+        """
+        return self._get(self._container.remove_last, timeout)
+
+
+class _AsyncContainer(object):
+    """ asyncio wrapper around one of the queues; must be used from tasks of
+        a single event loop
+    """
+
+    def __init__(self, container, capacity=None):
+        if capacity is not None and capacity < 1:
+            raise ValueError("Capacity must be positive, got %r" % capacity)
+        self._container = container
+        self._capacity = capacity
+        self._lock = asyncio.Lock()
+        self._not_empty = asyncio.Condition(self._lock)
+        self._not_full = asyncio.Condition(self._lock)
+
+    def __len__(self):
+        return len(self._container)
+
+    def is_empty(self):
+        return self._container.is_empty()
+
+    def _has_room(self):
+        return (self._capacity is None or
+                len(self._container) < self._capacity)
+
+    def _has_items(self):
+        return not self._container.is_empty()
+
+    @staticmethod
+    async def _wait(condition, predicate, timeout, error):
+        if predicate():
+            return
+        if timeout is None:
+            await condition.wait_for(predicate)
+            return
+        try:
+            await asyncio.wait_for(condition.wait_for(predicate), timeout)
+        except asyncio.TimeoutError:
+            raise error
+
+    async def _put(self, add, item, timeout):
+        async with self._lock:
+            await self._wait(self._not_full, self._has_room, timeout,
+                             queue.Full("Put to full queue"))
+            add(item)
+            self._not_empty.notify()
+
+    async def _get(self, remove, timeout):
+        async with self._lock:
+            await self._wait(self._not_empty, self._has_items, timeout,
+                             queue.Empty("Get from empty queue"))
+            item = remove()
+            self._not_full.notify()
+            return item
+
+
+class AsyncQueue(_AsyncContainer):
+    """ FIFO queue with awaitable get and put (when capacity is bounded) """
+
+    def __init__(self, capacity=None):
+        """ Initializes an empty queue holding at most capacity items """
+        super(AsyncQueue, self).__init__(ResizingArrayQueue(), capacity)
+
+    async def put(self, item, timeout=None):
+        """ Adds the item, waiting at most timeout seconds for free room """
+        await self._put(self._container.enqueue, item, timeout)
+
+    async def get(self, timeout=None):
+        """ Removes and returns least recently added item, waiting at most
+            timeout seconds for one
+        """
+        return await self._get(self._container.dequeue, timeout)
+
+
+class AsyncRandomizedQueue(_AsyncContainer):
+    """ RandomizedQueue with awaitable get and put """
+
+    def __init__(self, capacity=None):
+        """ Initializes an empty queue holding at most capacity items """
+        super(AsyncRandomizedQueue, self).__init__(RandomizedQueue(),
+                                                   capacity)
+
+    async def put(self, item, timeout=None):
+        """ Adds the item, waiting at most timeout seconds for free room """
+        await self._put(self._container.enqueue, item, timeout)
+
+    async def get(self, timeout=None):
+        """ Removes and returns random item, waiting at most timeout seconds
+            for one
+        """
+        return await self._get(self._container.dequeue, timeout)
+
+
+class AsyncDeque(_AsyncContainer):
+    """ Deque with awaitable removes and adds """
+
+    def __init__(self, capacity=None):
+        """ Initializes an empty deque holding at most capacity items """
+        super(AsyncDeque, self).__init__(BlockDeque(), capacity)
+
+    async def put_first(self, item, timeout=None):
+        """ Adds the item to the front """
+        await self._put(self._container.add_first, item, timeout)
+
+    async def put_last(self, item, timeout=None):
+        """ Adds the item to the end """
+        await self._put(self._container.add_last, item, timeout)
+
+    async def get_first(self, timeout=None):
+        """ Removes and returns the item from the front """
+        return await self._get(self._container.remove_first, timeout)
+
+    async def get_last(self, timeout=None):
+        """ Removes and returns the item from the end """
+        return await self._get(self._container.remove_last, timeout)
+
+
+if __name__ == "__main__":
+    # several producers and consumers through small bounded queues
+    for blocking in (BlockingQueue(capacity=4),
+                     BlockingRandomizedQueue(capacity=4)):
+        results = []
+        results_lock = threading.Lock()
+
+        def produce(start, q=blocking):
+            for i in range(start, start + 500):
+                q.put(i)
+
+        def consume(q=blocking):
+            items = [q.get(timeout=5) for _ in range(500)]
+            with results_lock:
+                results.extend(items)
+
+        threads = [threading.Thread(target=produce, args=(i * 500,))
+                   for i in range(3)]
+        threads += [threading.Thread(target=consume) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(results) == list(range(1500))
+        assert blocking.is_empty()
+        try:
+            blocking.get(timeout=0.01)
+        except queue.Empty:
+            pass
+        else:
+            raise AssertionError("queue.Empty expected")
+
+    d = BlockingDeque(capacity=2)
+    d.put_last(1)
+    d.put_first(0)
+    try:
+        d.put_last(2, timeout=0)
+    except queue.Full:
+        pass
+    else:
+        raise AssertionError("queue.Full expected")
+    assert d.get_last() == 1 and d.get_first() == 0
+
+    async def check_async():
+        q = AsyncQueue(capacity=2)
+
+        async def produce():
+            for i in range(100):
+                await q.put(i)
+
+        producer = asyncio.ensure_future(produce())
+        items = [await q.get(timeout=5) for _ in range(100)]
+        await producer
+        assert items == list(range(100))
+        try:
+            await q.get(timeout=0.01)
+        except queue.Empty:
+            pass
+        else:
+            raise AssertionError("queue.Empty expected")
+
+        r = AsyncRandomizedQueue()
+        for i in range(10):
+            await r.put(i)
+        assert sorted([await r.get() for _ in range(10)]) == list(range(10))
+
+        d = AsyncDeque()
+        await d.put_last(1)
+        await d.put_first(0)
+        assert await d.get_first() == 0 and await d.get_last() == 1
+
+    asyncio.run(check_async())
@@ -2,9 +2,12 @@
 
 
 class DequeNode(object):
-    item = None
-    next_node = None
-    prev_node = None
+    __slots__ = ("item", "next_node", "prev_node")
+
+    def __init__(self, item=None):
+        self.item = item
+        self.next_node = None
+        self.prev_node = None
 
     def __repr__(self):
         return "<DequeNode '%s'>" % self.item
@@ -19,14 +22,19 @@ class Deque(object):
     This implementation support each deque operation in constant worst-case
     time.
     A deque containing n items use space proportional to the number of items
-    currently in the deque.
+    currently in the deque (see BlockDeque in block_deque.py for more compact
+    layout with fixed-size blocks of items).
     Additionally, iterator implementation support each operation (including
     construction) in constant worst-case time.
     """
 
-    _first = None
-    _last = None
-    _count = 0
+    __slots__ = ("_first", "_last", "_count")
+
+    def __init__(self):
+        """ Construct an empty deque """
+        self._first = None
+        self._last = None
+        self._count = 0
 
     def is_empty(self):
         """ Return True if the deque is empty """
@@ -38,8 +46,7 @@ class Deque(object):
 
     def add_first(self, item):
         """ Add the item to the front """
-        node = DequeNode()
-        node.item = item
+        node = DequeNode(item)
 
         if self._first:
             node.next_node = self._first
@@ -52,8 +59,7 @@ class Deque(object):
 
     def add_last(self, item):
         """ Add the item to the end """
-        node = DequeNode()
-        node.item = item
+        node = DequeNode(item)
 
         if self._last:
             node.prev_node = self._last
@@ -96,6 +102,61 @@ class Deque(object):
 
         return node.item
 
+    def extend_first(self, items):
+        """ Add every item to the front in turn (so they end up in reverse
+            order)
+        """
+        for item in items:
+            self.add_first(item)
+
+    def extend_last(self, items):
+        """ Add every item to the end in turn """
+        for item in items:
+            self.add_last(item)
+
+    def _check_remove_many(self, k):
+        """ Validate that k items can be removed """
+        if k < 0 or k > self._count:
+            raise KeyError("Remove %d items from deque of size %d" % (
+                k, self._count
+            ))
+
+    def remove_first_many(self, k):
+        """ Remove and return list of k items from the front, in order from
+            the front
+        """
+        self._check_remove_many(k)
+        items = []
+        node = self._first
+        for _ in range(k):
+            items.append(node.item)
+            node = node.next_node
+        self._first = node
+        if node is None:
+            self._last = None
+        else:
+            node.prev_node = None
+        self._count -= k
+        return items
+
+    def remove_last_many(self, k):
+        """ Remove and return list of k items from the end, in order from
+            the end
+        """
+        self._check_remove_many(k)
+        items = []
+        node = self._last
+        for _ in range(k):
+            items.append(node.item)
+            node = node.prev_node
+        self._last = node
+        if node is None:
+            self._first = None
+        else:
+            node.next_node = None
+        self._count -= k
+        return items
+
     def __iter__(self):
         it = self._first
         while it:
@@ -131,3 +192,96 @@ if __name__ == "__main__":
     assert len(d) == 0
     d.add_last("")
     assert not d.is_empty()
+
+    # bulk operations
+    d = Deque()
+    d.extend_last([1, 2, 3])
+    d.extend_first([0, -1])
+    assert tuple(d) == (-1, 0, 1, 2, 3)
+    assert d.remove_first_many(2) == [-1, 0]
+    assert d.remove_last_many(2) == [3, 2]
+    assert tuple(d) == (1,)
+    assert d.remove_last_many(1) == [1]
+    assert d.is_empty()
+    d.extend_first("ab")
+    assert tuple(d) == ("b", "a")
+
+    # queue modules run stdin clients, so their queues are tested here
+    from randomized_queue import RandomizedQueue
+    from resizing_array_queue import ResizingArrayQueue
+
+    # bulk operations of ResizingArrayQueue (wrapped around the array end)
+    queue = ResizingArrayQueue()
+    queue.enqueue_many(range(6))
+    assert queue.dequeue_many(4) == [0, 1, 2, 3]
+    queue.enqueue_many("abcd")
+    assert list(queue) == [4, 5, "a", "b", "c", "d"]
+    assert list(queue.view()) == [4, 5, "a", "b", "c", "d"]
+    assert queue.view()[-1] == "d" and queue.view()[1:3] == [5, "a"]
+    assert queue.dequeue_many(5) == [4, 5, "a", "b", "c"]
+    assert queue.dequeue() == "d" and queue.is_empty()
+
+    # typed storage and hysteresis
+    queue = ResizingArrayQueue(capacity=4, growth=2, shrink=8, typecode="q")
+    queue.enqueue_many(range(100))
+    assert queue.dequeue_many(90) == list(range(90))
+    assert queue.view().tolist() == list(range(90, 100))
+    for i in range(10):
+        assert queue.dequeue() == 90 + i
+        queue.enqueue(i)
+    assert list(queue) == list(range(10))
+    assert len(queue._q) == 64
+
+    # typed view does not block modification of the queue
+    queue = ResizingArrayQueue(capacity=8, typecode="q")
+    queue.enqueue_many(range(6))
+    assert queue.dequeue_many(5) == [0, 1, 2, 3, 4]
+    view = queue.view()
+    queue.enqueue_many([])
+    queue.enqueue_many(range(10, 14))  # wraps around the array end
+    assert list(queue) == [5, 10, 11, 12, 13] and len(queue._q) == 8
+    assert queue.dequeue_many(0) == [] and queue.dequeue_many(2) == [5, 10]
+    view.release()
+
+    # fractional growth may shrink the array to exactly fit the items
+    queue = ResizingArrayQueue(capacity=1, growth=1.5, shrink=2)
+    queue.enqueue(1)
+    queue.enqueue(2)
+    assert queue.dequeue() == 1 and queue.dequeue() == 2
+    queue.enqueue(3)
+    queue.enqueue_many([4, 5])
+    assert list(queue) == [3, 4, 5]
+    for growth, shrink in ((1.5, 2), (1.25, 1.5), (3, 3.5)):
+        queue = ResizingArrayQueue(capacity=1, growth=growth, shrink=shrink)
+        for i in range(200):
+            queue.enqueue(i)
+            if i % 3 == 0:
+                queue.dequeue()
+        assert list(queue) == list(range(67, 200))
+
+    # typed storage and hysteresis of RandomizedQueue
+    queue = RandomizedQueue(capacity=4, growth=2, shrink=8, typecode="q")
+    for i in range(100):
+        queue.enqueue(i)
+    assert len(queue._q) == 128
+    removed = [queue.dequeue() for _ in range(90)]
+    assert len(queue._q) == 64
+    assert sorted(removed + list(queue)) == list(range(100))
+
+    # bulk operations and lazy iterator
+    queue = RandomizedQueue(seed=1)
+    for i in range(50):
+        queue.enqueue(i)
+    assert sorted(queue) == list(range(50))
+    assert set(queue.sample_many(100)) <= set(range(50))
+    assert sorted(queue.sample_many(50, replace=False)) == list(range(50))
+    removed = queue.dequeue_many(45)
+    assert len(set(removed)) == 45 and len(queue) == 5
+    assert sorted(removed + list(queue)) == list(range(50))
+    try:
+        for item in queue:
+            queue.enqueue(item)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("RuntimeError expected")
@@ -1,4 +1,5 @@
 # coding=utf8
+import random
 import sys
 
 from randomized_queue import RandomizedQueue
@@ -9,15 +10,38 @@ from randomized_queue import RandomizedQueue
 # them, uniformly at random.
 # 3. prints each item from the sequence at most once.
 
-try:
-    k = int(sys.argv[1])
-except (IndexError, ValueError):
-    print("Usage: python3 permutation.py *k*")
-    sys.exit()
 
-queue = RandomizedQueue()
-for item in sys.stdin.read().split():
-    queue.enqueue(item)
+def read_items(stream):
+    """ Yield whitespace-separated strings from stream, one line at a time """
+    for line in stream:
+        yield from line.split()
 
-for _ in range(k):
-    print(queue.dequeue())
+
+def sample(items, k):
+    """ Return RandomizedQueue with k items chosen uniformly at random from
+        iterable of items (all of them if there are fewer than k).
+
+        Reservoir sampling: i-th item (counting from 0) replaces a random item
+        of the queue with probability k / (i + 1), so the queue never holds
+        more than k items.
+    """
+    queue = RandomizedQueue()
+    for i, item in enumerate(items):
+        if i < k:
+            queue.enqueue(item)
+        elif random.randint(0, i) < k:
+            queue.dequeue()
+            queue.enqueue(item)
+    return queue
+
+
+if __name__ == "__main__":
+    try:
+        k = int(sys.argv[1])
+    except (IndexError, ValueError):
+        print("Usage: python3 permutation.py *k*")
+        sys.exit()
+
+    queue = sample(read_items(sys.stdin), k)
+    while not queue.is_empty():
+        print(queue.dequeue())
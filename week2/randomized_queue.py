@@ -1,6 +1,7 @@
 # coding=utf8
 import sys
 import random
+from array import array
 
 
 class RandomizedQueue(object):
@@ -8,19 +9,50 @@ class RandomizedQueue(object):
     A randomized queue is similar to a stack or queue, except that the item
     removed is chosen uniformly at random from items in the data structure.
 
-    This implementation support each randomized queue operation (besides
-    creating an iterator) in constant amortized time. Additionally, iterator
-    implementation support operation next() in constant worst-case time and
-    construction in linear time.
+    This implementation support each randomized queue operation in constant
+    amortized time. Additionally, iterator implementation support operation
+    next() and construction in constant worst-case time: it shuffles lazily
+    (incremental Fisher–Yates), remembering only the positions it swapped.
+
+    Random indices are drawn from own seedable generator as int(random() * n),
+    which is much cheaper than random.randint.
+
+    Underlying array grows and shrinks by configurable factors, and numeric
+    payloads may be kept in typed array (see array module typecodes) instead
+    of list of Python objects.
 
     Disclaimer: Python has it's own resize mechanism for lists, so '_resize'
     method and pre-init of lists are implemented just for educational purpose.
     """
 
-    def __init__(self):
-        """ Construct an empty randomized queue """
-        self._q = [None] * 2
+    def __init__(self, capacity=2, growth=2, shrink=4, typecode=None,
+                 seed=None):
+        """ Construct an empty randomized queue.
+
+            Underlying array grows by growth factor when it is full and
+            shrinks by the same factor when it is 1/shrink full, but never
+            below initial capacity. shrink must be greater than growth.
+
+            With typecode (for example "d" or "q") items are kept in
+            array.array of that type.
+
+            seed initializes random generator of this queue.
+        """
+        if capacity < 1 or growth <= 1 or shrink <= growth:
+            raise ValueError(
+                "Expected capacity >= 1 and 1 < growth < shrink, got "
+                "capacity=%r, growth=%r, shrink=%r" % (
+                    capacity, growth, shrink
+                )
+            )
+        self._min_capacity = capacity
+        self._growth, self._shrink = growth, shrink
+        self._typecode = typecode
+        self._q = self._alloc(capacity)
         self._n = 0
+        self._random = random.Random(seed)
+        # number of modifications, checked by iterators
+        self._version = 0
 
     def is_empty(self):
         """ Return True if queue is empty """
@@ -30,22 +62,42 @@ class RandomizedQueue(object):
         """ Return the number of items on the queue """
         return self._n
 
+    def _alloc(self, capacity):
+        """ Return new underlying array of given capacity """
+        if self._typecode is None:
+            return [None] * capacity
+        return array(self._typecode, bytes(
+            capacity * array(self._typecode).itemsize
+        ))
+
     def _resize(self, capacity):
-        """ Resize the underlying array """
-        temp = [None] * capacity
-        for i in range(self._n):
-            temp[i] = self._q[i]
+        """ Resize the underlying array, copying items by one slice """
+        temp = self._alloc(capacity)
+        temp[:self._n] = self._q[:self._n]
         self._q = temp
 
+    def _shrink_if_sparse(self):
+        """ Shrink the underlying array if it is 1/shrink full """
+        capacity = len(self._q)
+        while 0 < self._n <= capacity // self._shrink:
+            smaller = max(self._min_capacity, int(capacity / self._growth))
+            if smaller == capacity:
+                break
+            capacity = smaller
+        if capacity != len(self._q):
+            self._resize(capacity)
+
     def enqueue(self, item):
         """ Add the item to this queue """
 
-        # double size of array if necessary
+        # grow array if necessary
         if self._n == len(self._q):
-            self._resize(2 * len(self._q))
+            capacity = len(self._q)
+            self._resize(max(capacity + 1, int(capacity * self._growth)))
 
         self._q[self._n] = item
         self._n += 1
+        self._version += 1
 
     def dequeue(self):
         """ Remove and return random item from queue """
@@ -54,15 +106,16 @@ class RandomizedQueue(object):
 
         # choose random element, pop it and replace
         # with last element from array
-        idx = random.randint(0, self._n - 1)
+        idx = int(self._random.random() * self._n)
         item = self._q[idx]
         self._q[idx] = self._q[self._n - 1]
-        self._q[self._n - 1] = None
+        if self._typecode is None:
+            self._q[self._n - 1] = None
         self._n -= 1
+        self._version += 1
 
         # shrink size of array if necessary
-        if self._n > 0 and self._n == len(self._q) // 4:
-            self._resize(len(self._q) // 2)
+        self._shrink_if_sparse()
 
         return item
 
@@ -71,13 +124,58 @@ class RandomizedQueue(object):
         if self.is_empty():
             raise KeyError("Sample from empty queue")
 
-        return self._q[random.randint(0, self._n - 1)]
+        return self._q[int(self._random.random() * self._n)]
+
+    def dequeue_many(self, k):
+        """ Remove and return list of k random items (in random order) """
+        if k < 0 or k > self._n:
+            raise KeyError("Dequeue %d items from queue of size %d" % (
+                k, self._n
+            ))
+
+        # partial Fisher–Yates: move k random items to the end of live slice
+        q, rand, n = self._q, self._random.random, self._n
+        for last in range(n - 1, n - k - 1, -1):
+            idx = int(rand() * (last + 1))
+            q[idx], q[last] = q[last], q[idx]
+        items = list(q[n - k:n])
+        if self._typecode is None:
+            q[n - k:n] = [None] * k
+        self._n -= k
+        self._version += 1
+
+        # shrink size of array if necessary
+        self._shrink_if_sparse()
+
+        return items
+
+    def sample_many(self, k, replace=True):
+        """ Return (but not remove) list of k random items, drawn with or
+            without replacement
+        """
+        n = self._n
+        if (n == 0 and k > 0) or (not replace and k > n) or k < 0:
+            raise KeyError("Sample %d items from queue of size %d" % (k, n))
+
+        q, rand = self._q, self._random.random
+        if replace:
+            return [q[int(rand() * n)] for _ in range(k)]
+        return [q[idx] for idx in self._random.sample(range(n), k)]
 
     def __iter__(self):
-        """ Return an independent iterator over items in random order """
-        items = self._q[:self._n]
-        random.shuffle(items)
-        yield from items
+        """ Return an iterator over items in random order. The queue must not
+            be modified while iterating.
+        """
+        q, rand, n = self._q, self._random.random, self._n
+        version = self._version
+        # positions of the virtual shuffled array which differ from identity
+        swapped = {}
+        for i in range(n):
+            if self._version != version:
+                raise RuntimeError("Queue changed during iteration")
+            j = i + int(rand() * (n - i))
+            yield q[swapped.get(j, j)]
+            swapped[j] = swapped.pop(i, i)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,36 @@
 # coding=utf8
 import sys
+from array import array
+
+try:
+    from collections.abc import Sequence
+except ImportError:  # Python < 3.3
+    from collections import Sequence
+
+
+class QueueView(Sequence):
+    """ Read-only sequence of queue items in FIFO order which shares storage
+        with the queue instead of copying it. The view is valid until the
+        queue is modified.
+    """
+
+    def __init__(self, q, first, n):
+        self._q, self._first, self._n = q, first, n
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._n))]
+        if idx < 0:
+            idx += self._n
+        if idx < 0 or idx >= self._n:
+            raise IndexError("View index out of range")
+        return self._q[(self._first + idx) % len(self._q)]
+
+    def __repr__(self):
+        return "<QueueView %r>" % list(self)
 
 
 class ResizingArrayQueue(object):
@@ -10,9 +41,13 @@ class ResizingArrayQueue(object):
     iterating through the items in FIFO order.
 
     This implementation uses resizing array, which double the underlying array
-    when it is full and halves underlying array when it is one-quarter full.
-    The enqueue and dequeue operations take constant amortized time. The len(),
-    peek, and is_empty operations takes constant time in the worst case.
+    when it is full and halves underlying array when it is one-quarter full
+    (both factors are configurable). The enqueue and dequeue operations take
+    constant amortized time. The len(), peek, and is_empty operations takes
+    constant time in the worst case.
+
+    Numeric payloads may be kept in typed array (see array module typecodes)
+    instead of list of Python objects.
 
     All credits goes to Robert Sedgewick and Kevin Wayne.
 
@@ -20,9 +55,27 @@ class ResizingArrayQueue(object):
     method and pre-init of lists are implemented just for educational purposes.
     """
 
-    def __init__(self):
-        """ Initializes an empty queue """
-        self._q = [None] * 2
+    def __init__(self, capacity=2, growth=2, shrink=4, typecode=None):
+        """ Initializes an empty queue.
+
+            Underlying array grows by growth factor when it is full and
+            shrinks by the same factor when it is 1/shrink full, but never
+            below initial capacity. shrink must be greater than growth.
+
+            With typecode (for example "d" or "q") items are kept in
+            array.array of that type.
+        """
+        if capacity < 1 or growth <= 1 or shrink <= growth:
+            raise ValueError(
+                "Expected capacity >= 1 and 1 < growth < shrink, got "
+                "capacity=%r, growth=%r, shrink=%r" % (
+                    capacity, growth, shrink
+                )
+            )
+        self._min_capacity = capacity
+        self._growth, self._shrink = growth, shrink
+        self._typecode = typecode
+        self._q = self._alloc(capacity)
         self._n, self._first, self._last = 0, 0, 0
 
     def is_empty(self):
@@ -33,21 +86,52 @@ class ResizingArrayQueue(object):
         """ Returns the number of items in this queue """
         return self._n
 
+    def _alloc(self, capacity):
+        """ Returns new underlying array of given capacity """
+        if self._typecode is None:
+            return [None] * capacity
+        return array(self._typecode, bytes(
+            capacity * array(self._typecode).itemsize
+        ))
+
     def _resize(self, capacity):
-        """ Resize the underlying array """
-        temp = [None] * capacity
-        for i in range(self._n):
-            temp[i] = self._q[(self._first + i) % len(self._q)]
+        """ Resize the underlying array, copying items by two slices (before
+            and after wrap-around)
+        """
+        temp = self._alloc(capacity)
+        head = min(self._n, len(self._q) - self._first)
+        temp[:head] = self._q[self._first:self._first + head]
+        temp[head:self._n] = self._q[:self._n - head]
         self._q = temp
 
-        self._first, self._last = 0, self._n
+        # array may be shrunk to exactly n items with fractional growth
+        self._first, self._last = 0, self._n % capacity
+
+    def _grow(self, n):
+        """ Grow the underlying array to fit n items if necessary """
+        capacity = len(self._q)
+        while n > capacity:
+            capacity = max(capacity + 1, int(capacity * self._growth))
+        if capacity != len(self._q):
+            self._resize(capacity)
+
+    def _shrink_if_sparse(self):
+        """ Shrink the underlying array if it is 1/shrink full """
+        capacity = len(self._q)
+        while 0 < self._n <= capacity // self._shrink:
+            smaller = max(self._min_capacity, int(capacity / self._growth))
+            if smaller == capacity:
+                break
+            capacity = smaller
+        if capacity != len(self._q):
+            self._resize(capacity)
 
     def enqueue(self, item):
         """ Adds the item to this queue """
 
-        # double size of array if necessary and recopy to front of array
+        # grow array if necessary and recopy to front of array
         if self._n == len(self._q):
-            self._resize(2 * len(self._q))
+            self._grow(self._n + 1)
 
         self._q[self._last] = item
         self._n += 1
@@ -62,7 +146,8 @@ class ResizingArrayQueue(object):
             raise KeyError("Dequeue from empty queue")
 
         item = self._q[self._first]
-        self._q[self._first] = None
+        if self._typecode is None:
+            self._q[self._first] = None
         self._n -= 1
         self._first += 1
 
@@ -70,11 +155,66 @@ class ResizingArrayQueue(object):
             self._first = 0  # wrap-around
 
         # shrink size of array if necessary
-        if self._n > 0 and self._n == len(self._q) // 4:
-            self._resize(len(self._q) // 2)
+        self._shrink_if_sparse()
 
         return item
 
+    def enqueue_many(self, items):
+        """ Adds every item to this queue, copying them into the underlying
+            array by at most two slices (before and after wrap-around)
+        """
+        if self._typecode is None:
+            items = list(items)
+        else:
+            items = array(self._typecode, items)
+        k = len(items)
+        self._grow(self._n + k)
+
+        # assigning an empty slice counts as resizing, which fails while a
+        # typed view exports the array, so empty parts are not copied
+        head = min(k, len(self._q) - self._last)
+        if head:
+            self._q[self._last:self._last + head] = items[:head]
+        if k > head:
+            self._q[:k - head] = items[head:]
+        self._n += k
+        self._last = (self._last + k) % len(self._q)
+
+    def dequeue_many(self, k):
+        """ Removes and returns list of k least recently added items in FIFO
+            order, copying them out of the underlying array by at most two
+            slices
+        """
+        if k < 0 or k > self._n:
+            raise KeyError("Dequeue %d items from queue of size %d" % (
+                k, self._n
+            ))
+
+        head = min(k, len(self._q) - self._first)
+        items = self._q[self._first:self._first + head] + self._q[:k - head]
+        if self._typecode is None and head:
+            self._q[self._first:self._first + head] = [None] * head
+            if k > head:
+                self._q[:k - head] = [None] * (k - head)
+        self._n -= k
+        self._first = (self._first + k) % len(self._q)
+
+        # shrink size of array if necessary
+        self._shrink_if_sparse()
+
+        return list(items)
+
+    def view(self):
+        """ Returns view of the items in FIFO order without copying them
+            (valid until this queue is modified). Typed queue which does not
+            wrap around the array end returns a memoryview, which shares
+            storage with the queue: callers must not write to it.
+        """
+        first, n = self._first, self._n
+        if self._typecode is not None and first + n <= len(self._q):
+            return memoryview(self._q)[first:first + n]
+        return QueueView(self._q, first, n)
+
     def peek(self):
         """ Returns the item least recently added to this queue """
         if self.is_empty():
@@ -87,7 +227,7 @@ class ResizingArrayQueue(object):
             in this queue in FIFO order.
         """
         for i in range(self._n):
-            yield self._q[i + self._first % len(self._q)]
+            yield self._q[(self._first + i) % len(self._q)]
 
 
 if __name__ == "__main__":
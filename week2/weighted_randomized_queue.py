@@ -0,0 +1,201 @@
+# coding=utf8
+import random
+
+
+class WeightedRandomizedQueue(object):
+    """
+    A weighted randomized queue is similar to a randomized queue, except that
+    the item removed (or sampled) is chosen at random with probability
+    proportional to its weight.
+
+    This implementation keeps items in slots of resizing array and their
+    weights in a Fenwick (binary indexed) tree over the slots, so enqueue,
+    dequeue, sample and weight update take logarithmic time (enqueue in
+    amortized sense). Free slots are reused, so a queue uses space
+    proportional to the largest number of items it held at once.
+
+    enqueue returns a handle of the item (its slot), which is valid until the
+    item is removed and is used to read or update the weight.
+    """
+
+    def __init__(self, seed=None):
+        """ Construct an empty weighted randomized queue """
+        self._items = [None] * 2
+        self._weights = [0.0] * 2
+        # 1-based Fenwick tree: _tree[i] is sum of weights in slots
+        # (i - lowbit(i), i]
+        self._tree = [0.0] * 3
+        self._free = []
+        self._used = 0
+        self._n = 0
+        self._random = random.Random(seed)
+
+    def is_empty(self):
+        """ Return True if queue is empty """
+        return self._n == 0
+
+    def __len__(self):
+        """ Return the number of items on the queue """
+        return self._n
+
+    def _add(self, slot, delta):
+        """ Add delta to weight of slot in the tree """
+        tree, i = self._tree, slot + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _rebuild(self):
+        """ Build the tree from slot weights in linear time """
+        tree = [0.0] * (len(self._weights) + 1)
+        for i, weight in enumerate(self._weights, 1):
+            tree[i] += weight
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _resize(self, capacity):
+        """ Resize the underlying arrays and rebuild the tree """
+        grow = capacity - len(self._items)
+        self._items += [None] * grow
+        self._weights += [0.0] * grow
+        self._rebuild()
+
+    def _validate_handle(self, handle):
+        """ Validate that handle refers to an item on the queue """
+        if not 0 <= handle < self._used or self._weights[handle] == 0:
+            raise KeyError("No item with handle %r" % handle)
+
+    @staticmethod
+    def _validate_weight(weight):
+        """ Validate that weight is positive """
+        if not weight > 0:
+            raise ValueError("Weight must be positive, got %r" % weight)
+
+    def total_weight(self):
+        """ Return sum of weights of all items """
+        tree, i, total = self._tree, len(self._weights), 0.0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def enqueue(self, item, weight=1.0):
+        """ Add the item with given positive weight and return its handle """
+        self._validate_weight(weight)
+        if self._free:
+            slot = self._free.pop()
+        else:
+            # double size of arrays if necessary
+            if self._used == len(self._items):
+                self._resize(2 * len(self._items))
+            slot = self._used
+            self._used += 1
+
+        self._items[slot] = item
+        self._weights[slot] = weight
+        self._add(slot, weight)
+        self._n += 1
+        return slot
+
+    def weight(self, handle):
+        """ Return weight of the item with given handle """
+        self._validate_handle(handle)
+        return self._weights[handle]
+
+    def update(self, handle, weight):
+        """ Set new positive weight of the item with given handle """
+        self._validate_handle(handle)
+        self._validate_weight(weight)
+        self._add(handle, weight - self._weights[handle])
+        self._weights[handle] = weight
+
+    def _choose(self):
+        """ Return slot chosen with probability proportional to its weight """
+        target = self._random.random() * self.total_weight()
+        tree, capacity = self._tree, len(self._weights)
+        # descend the tree looking for the last prefix not greater than target
+        slot, step = 0, 1 << (capacity.bit_length() - 1)
+        while step:
+            if slot + step <= capacity and tree[slot + step] <= target:
+                slot += step
+                target -= tree[slot]
+            step >>= 1
+
+        # floating point rounding may point past the last item or to a free
+        # slot with zero weight; step back to the nearest item then
+        slot = min(slot, self._used - 1)
+        while self._weights[slot] == 0:
+            slot -= 1
+        return slot
+
+    def dequeue(self):
+        """ Remove and return random item chosen by weight """
+        if self.is_empty():
+            raise KeyError("Dequeue from empty queue")
+
+        slot = self._choose()
+        item = self._items[slot]
+        self._add(slot, -self._weights[slot])
+        self._items[slot] = None
+        self._weights[slot] = 0.0
+        self._free.append(slot)
+        self._n -= 1
+
+        if self._n == 0:
+            # drop accumulated rounding errors
+            self._free, self._used = [], 0
+            self._rebuild()
+
+        return item
+
+    def sample(self):
+        """ Return (but not remove) random item chosen by weight """
+        if self.is_empty():
+            raise KeyError("Sample from empty queue")
+
+        return self._items[self._choose()]
+
+    def __iter__(self):
+        """ Return an iterator over (item, weight) pairs in no particular
+            order
+        """
+        for slot in range(self._used):
+            if self._weights[slot] != 0:
+                yield self._items[slot], self._weights[slot]
+
+
+if __name__ == "__main__":
+    queue = WeightedRandomizedQueue(seed=1)
+    assert queue.is_empty()
+    handles = {name: queue.enqueue(name, weight)
+               for name, weight in (("a", 1), ("b", 2), ("c", 7))}
+    assert len(queue) == 3
+    assert abs(queue.total_weight() - 10) < 1e-9
+
+    counts = {"a": 0, "b": 0, "c": 0}
+    for _ in range(10000):
+        counts[queue.sample()] += 1
+    assert 700 < counts["a"] < 1300 and 6500 < counts["c"] < 7500
+
+    queue.update(handles["c"], 0.001)
+    assert queue.weight(handles["c"]) == 0.001
+    counts = {"a": 0, "b": 0, "c": 0}
+    for _ in range(10000):
+        counts[queue.sample()] += 1
+    assert counts["c"] < 20
+
+    assert sorted(queue.dequeue() for _ in range(3)) == ["a", "b", "c"]
+    assert queue.is_empty()
+    try:
+        queue.update(handles["a"], 1)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("KeyError expected")
+
+    for i in range(100):
+        queue.enqueue(i, i + 1)
+    assert sorted(item for item, _ in queue) == list(range(100))
+    assert sorted(queue.dequeue() for _ in range(100)) == list(range(100))